@@ -8,30 +8,65 @@ https://github.com/masaccio/ha-kingspan-watchman-sensit
 import asyncio
 import builtins
 import logging
-from datetime import timedelta
+from dataclasses import asdict
+from datetime import datetime, timedelta
 from typing import Any
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HassJob, HomeAssistant, callback
 from homeassistant.core_config import Config
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
 from homeassistant.helpers import issue_registry as ir
-
-from .api import KingspanAPIError, SENSiTApiClient
+from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.event import async_call_later
+
+from .accounts import (
+    async_get_account,
+    async_get_settings_entry,
+    async_pop_validated_client,
+    async_release_account,
+)
+from .api import (
+    KingspanAPIError,
+    KingspanInvalidCredentialsError,
+    SENSiTApiClient,
+    set_api_debug,
+)
 from .const import (
+    ADAPTIVE_MIN_INTERVAL,
+    CONF_ACCOUNTS,
+    CONF_ADAPTIVE_POLLING,
+    CONF_API_CONCURRENCY,
+    CONF_HTTP_IDLE_TIMEOUT,
+    CONF_HTTP_POOL_SIZE,
     CONF_KINGSPAN_DEBUG,
+    CONF_OIL_ENERGY_DENSITY,
     CONF_PASSWORD,
+    CONF_RATE_LIMIT,
     CONF_UPDATE_INTERVAL,
     CONF_USAGE_WINDOW,
     CONF_USERNAME,
+    DEFAULT_API_CONCURRENCY,
+    DEFAULT_HTTP_IDLE_TIMEOUT,
+    DEFAULT_HTTP_POOL_SIZE,
+    DEFAULT_RATE_LIMIT,
     DEFAULT_UPDATE_INTERVAL,
     DEFAULT_USAGE_WINDOW,
     DOMAIN,
+    LEVEL_TTL_FACTOR,
     PLATFORMS,
 )
-from .coordinator import SENSiTDataUpdateCoordinator
+from .coordinator import SENSiTDataUpdateCoordinator, SENSiTFleetCoordinator
+from .resilience import async_get_circuit_breaker, async_get_rate_limiter, is_outage_error
+from .scheduler import PollScheduler
+from .store import SENSiTStore
+from .transport import (
+    async_acquire_http_client,
+    async_release_http_client,
+    async_resize_http_client,
+)
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)  # pylint: disable=invalid-name
 
@@ -42,6 +77,21 @@ TO_REDACT = [
     CONF_PASSWORD,
 ]
 
+# Options that are applied to a loaded entry without reloading it
+LIVE_OPTIONS = frozenset(
+    {
+        CONF_ADAPTIVE_POLLING,
+        CONF_API_CONCURRENCY,
+        CONF_HTTP_IDLE_TIMEOUT,
+        CONF_HTTP_POOL_SIZE,
+        CONF_KINGSPAN_DEBUG,
+        CONF_OIL_ENERGY_DENSITY,
+        CONF_RATE_LIMIT,
+        CONF_UPDATE_INTERVAL,
+        CONF_USAGE_WINDOW,
+    }
+)
+
 
 async def async_setup(_hass: HomeAssistant, _config: Config) -> bool:
     """Set up this integration using YAML is not supported."""
@@ -70,25 +120,21 @@ def _async_delete_repair_issue(hass: HomeAssistant, config_entry: ConfigEntry) -
     ir.async_delete_issue(hass, DOMAIN, f"credentials_{config_entry.entry_id}")
 
 
-async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
-    """Set up this integration using UI."""
-    if hass.data.get(DOMAIN) is None:
-        hass.data.setdefault(DOMAIN, {})
+def _level_ttl(update_interval: timedelta, adaptive_polling: bool) -> float:
+    """Return how long a fetched level is reused for, in seconds."""
+    # Scheduled polls always fetch a new level, but other refreshes such as
+    # reloads reuse a level fetched since the last poll
+    shortest_interval = (
+        timedelta(minutes=ADAPTIVE_MIN_INTERVAL) if adaptive_polling else update_interval
+    )
+    return shortest_interval.total_seconds() * LEVEL_TTL_FACTOR
 
-    username = config_entry.data.get(CONF_USERNAME)
-    password = config_entry.data.get(CONF_PASSWORD)
-    usage_window = config_entry.options.get(CONF_USAGE_WINDOW, DEFAULT_USAGE_WINDOW)
-    kingspan_debug = config_entry.options.get(CONF_KINGSPAN_DEBUG, False)
 
-    if username is None or not username:
-        _async_create_repair_issue(hass, config_entry)
-        raise ConfigEntryAuthFailed(
-            "Credentials not set",
-            translation_domain=DOMAIN,
-            translation_key="credentials_not_set",
-        )
-
-    client = SENSiTApiClient(username, str(password), usage_window, kingspan_debug)
+async def _async_check_credentials(
+    hass: HomeAssistant, config_entry: ConfigEntry, client: SENSiTApiClient
+) -> bool:
+    """Check that the entry can log in, raising if it should be retried or reauthenticated."""
+    username = config_entry.data.get(CONF_USERNAME)
     try:
         credentials_ok = await client.check_credentials()
     except KingspanAPIError as e:
@@ -96,6 +142,13 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
             _LOGGER.warning("No data available for username '%s'", username)
             _async_delete_repair_issue(hass, config_entry)
             return False
+        if not isinstance(e, KingspanInvalidCredentialsError) and is_outage_error(e):
+            _LOGGER.debug("Kingspan service unavailable for username '%s': %s", username, e)
+            raise ConfigEntryNotReady(
+                "Kingspan service unavailable",
+                translation_domain=DOMAIN,
+                translation_key="service_unavailable",
+            ) from e
         _LOGGER.debug("Credentials check for username '%s' failed: %s", username, e)
         _async_create_repair_issue(hass, config_entry)
         raise ConfigEntryAuthFailed(
@@ -115,20 +168,175 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     if not credentials_ok:
         _LOGGER.warning("No data available for username '%s'", username)
         _async_delete_repair_issue(hass, config_entry)
-        return False
+    return credentials_ok
+
+
+async def _async_refresh_stored_data(
+    hass: HomeAssistant, config_entry: ConfigEntry, coordinator: SENSiTDataUpdateCoordinator
+) -> None:
+    """Check credentials and refresh an entry that started with stored data.
+
+    The refresh is always made, so entities become unavailable rather than
+    showing stored data as current if the Kingspan service cannot be used.
+    """
+    try:
+        await _async_check_credentials(hass, config_entry, coordinator.api)
+    except ConfigEntryAuthFailed:
+        config_entry.async_start_reauth(hass)
+    except ConfigEntryNotReady:
+        _LOGGER.debug("Kingspan service unavailable when refreshing %s", config_entry.title)
+    else:
+        _async_delete_repair_issue(hass, config_entry)
+
+    await coordinator.async_refresh()
+
 
-    coordinator = SENSiTDataUpdateCoordinator(
+@callback
+def _async_schedule_stored_data_refresh(
+    hass: HomeAssistant, config_entry: ConfigEntry, coordinator: SENSiTDataUpdateCoordinator
+) -> None:
+    """Refresh an entry that started with stored data once its startup delay has passed."""
+    name = f"{DOMAIN} refresh {config_entry.title}"
+
+    @callback
+    def _async_start_refresh(_now: datetime) -> None:
+        config_entry.async_create_background_task(
+            hass, _async_refresh_stored_data(hass, config_entry, coordinator), name
+        )
+
+    delay = coordinator.startup_refresh_delay()
+    _LOGGER.debug("Refreshing %s in %.0f seconds", config_entry.title, delay)
+    config_entry.async_on_unload(
+        async_call_later(hass, delay, HassJob(_async_start_refresh, name, cancel_on_shutdown=True))
+    )
+
+
+async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Set up this integration using UI."""
+    if hass.data.get(DOMAIN) is None:
+        hass.data.setdefault(DOMAIN, {})
+
+    username = config_entry.data.get(CONF_USERNAME)
+    password = config_entry.data.get(CONF_PASSWORD)
+    usage_window = config_entry.options.get(CONF_USAGE_WINDOW, DEFAULT_USAGE_WINDOW)
+    kingspan_debug = config_entry.options.get(CONF_KINGSPAN_DEBUG, False)
+    api_concurrency = config_entry.options.get(CONF_API_CONCURRENCY, DEFAULT_API_CONCURRENCY)
+
+    if username is None or not username:
+        _async_create_repair_issue(hass, config_entry)
+        raise ConfigEntryAuthFailed(
+            "Credentials not set",
+            translation_domain=DOMAIN,
+            translation_key="credentials_not_set",
+        )
+
+    update_interval = timedelta(
+        hours=config_entry.options.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
+    )
+    adaptive_polling = config_entry.options.get(CONF_ADAPTIVE_POLLING, False)
+    # The rate limit and connection pool apply to all entries, so are set by the oldest entry
+    settings_entry = async_get_settings_entry(hass) or config_entry
+    rate_limiter = async_get_rate_limiter(hass)
+    rate_limiter.rate = settings_entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)
+
+    http_client = async_acquire_http_client(
         hass,
-        client=client,
-        config_entry=config_entry,
-        update_interval=timedelta(
-            hours=config_entry.options.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
-        ),
+        settings_entry.options.get(CONF_HTTP_POOL_SIZE, DEFAULT_HTTP_POOL_SIZE),
+        settings_entry.options.get(CONF_HTTP_IDLE_TIMEOUT, DEFAULT_HTTP_IDLE_TIMEOUT),
     )
-    await coordinator.async_refresh()
 
-    if not coordinator.last_update_success:  # pragma: no cover
-        raise ConfigEntryNotReady
+    def create_client(username: str, password: str) -> SENSiTApiClient:
+        client = SENSiTApiClient(username, password, usage_window, kingspan_debug, api_concurrency)
+        client.level_ttl = _level_ttl(update_interval, adaptive_polling)
+        # An outage affects every account so all entries stop polling together
+        client.circuit_breaker = async_get_circuit_breaker(hass)
+        client.rate_limiter = rate_limiter
+        client.http_client = http_client
+        return client
+
+    store = SENSiTStore(hass, config_entry.entry_id)
+    coordinator: SENSiTDataUpdateCoordinator | None = None
+    # Everything after acquiring the pool releases it, and the account, if setup fails
+    try:
+        if config_entry.data.get(CONF_ACCOUNTS):
+            # Fleet entries poll their own clients rather than sharing them with other entries
+            credentials = [(username, str(password))] + [
+                (account[CONF_USERNAME], account[CONF_PASSWORD])
+                for account in config_entry.data[CONF_ACCOUNTS]
+            ]
+            clients = [create_client(*account) for account in credentials]
+            coordinator = SENSiTFleetCoordinator(
+                hass,
+                clients=clients,
+                config_entry=config_entry,
+                update_interval=update_interval,
+                store=store,
+            )
+            for client, account in zip(clients, credentials, strict=True):
+                validated_client = await async_pop_validated_client(hass, *account)
+                if validated_client is not None:
+                    await client.async_adopt_session(validated_client)
+        else:
+            account = async_get_account(
+                hass, username, str(password), lambda: create_client(username, str(password))
+            )
+            coordinator = SENSiTDataUpdateCoordinator(
+                hass,
+                client=account.client,
+                config_entry=config_entry,
+                update_interval=update_interval,
+                store=store,
+            )
+            coordinator.peers = account.coordinators
+            account.coordinators.append(coordinator)
+
+            validated_client = await async_pop_validated_client(hass, username, str(password))
+            if validated_client is not None and coordinator.peers == [coordinator]:
+                _LOGGER.debug("Using session validated by config flow for username '%s'", username)
+                await account.client.async_adopt_session(validated_client)
+            elif validated_client is not None:
+                await validated_client.async_close()
+
+        if adaptive_polling:
+            coordinator.scheduler = PollScheduler(coordinator.update_interval)
+        # Entries sharing a client keep their own options, and the client uses the
+        # shortest level TTL and lowest concurrency of all of them
+        coordinator.usage_window = usage_window
+        coordinator.level_ttl = _level_ttl(update_interval, adaptive_polling)
+        coordinator.api_concurrency = api_concurrency
+        coordinator.async_apply_client_limits()
+        setup_ok = await _async_setup_coordinator(hass, config_entry, coordinator)
+    except BaseException:
+        if coordinator is not None:
+            await async_release_account(hass, coordinator)
+        await async_release_http_client(hass)
+        raise
+    if not setup_ok:
+        await async_release_account(hass, coordinator)
+        await async_release_http_client(hass)
+    return setup_ok
+
+
+async def _async_setup_coordinator(
+    hass: HomeAssistant, config_entry: ConfigEntry, coordinator: SENSiTDataUpdateCoordinator
+) -> bool:
+    """Provide the first states for an entry and set up its platforms."""
+    username = config_entry.data.get(CONF_USERNAME)
+    client = coordinator.api
+
+    # Entities start with the data saved by the last refresh, if there is any,
+    # so that a slow Kingspan service does not hold up Home Assistant startup
+    stored_data = await coordinator.async_load_stored_data()
+    if stored_data:
+        _LOGGER.debug("Starting with stored data for username '%s'", username)
+        coordinator.data = stored_data
+    else:
+        if not await _async_check_credentials(hass, config_entry, client):
+            return False
+        await coordinator.async_refresh()
+
+        if not coordinator.last_update_success:  # pragma: no cover
+            raise ConfigEntryNotReady
 
     config_entry.runtime_data = coordinator
     hass.data[DOMAIN][config_entry.entry_id] = coordinator
@@ -137,9 +345,13 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         if config_entry.options.get(platform, True):  # pragma: no branch
             coordinator.platforms.append(platform)
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    coordinator.set_first_state(warm_start=bool(stored_data))
 
-    _async_delete_repair_issue(hass, config_entry)
-    config_entry.add_update_listener(async_reload_entry)
+    if stored_data:
+        _async_schedule_stored_data_refresh(hass, config_entry, coordinator)
+    else:
+        _async_delete_repair_issue(hass, config_entry)
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
     return True
 
 
@@ -150,9 +362,19 @@ async def async_get_config_entry_diagnostics(
     coordinator = getattr(entry, "runtime_data", None)
     if coordinator is None:
         coordinator = hass.data[DOMAIN][entry.entry_id]
-    return {
+    diagnostics: dict[str, Any] = {
         "config_entry_data": async_redact_data(entry.data, TO_REDACT),
         "last_update_success": coordinator.last_update_success,
+        "api_statistics": asdict(coordinator.api.statistics),
+        "circuit_breaker": asdict(coordinator.api.circuit_breaker.statistics),
+        "rate_limiter": asdict(coordinator.api.rate_limiter.statistics),
+        "startup": asdict(coordinator.startup),
+        "entity_updates": asdict(coordinator.listener_statistics),
+        "shared_entries": len(coordinator.peers),
+        "poll_schedule": asdict(coordinator.poll_schedule),
+        "scheduler": (
+            asdict(coordinator.scheduler.statistics) if coordinator.scheduler is not None else None
+        ),
         "tank_count": len(coordinator.data),
         "tanks": [
             {
@@ -162,13 +384,34 @@ async def async_get_config_entry_diagnostics(
                 "name": tank.name,
                 "capacity": tank.capacity,
                 "last_read": tank.last_read,
-                "history": tank.history,
-                "usage_rate": tank.usage_rate,
-                "forecast_empty": tank.forecast_empty,
+                "history": tank.history.as_list() if tank.history is not None else None,
+                "analytics": asdict(tank.analytics),
             }
-            for tank in coordinator.data
+            for tank in coordinator.data.values()
         ],
     }
+    if isinstance(coordinator, SENSiTFleetCoordinator):
+        diagnostics["fleet_accounts"] = [
+            {
+                **asdict(status),
+                "api_statistics": asdict(client.statistics),
+            }
+            for client, status in zip(coordinator.clients, coordinator.account_status, strict=True)
+        ]
+    return diagnostics
+
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
+) -> bool:
+    """Allow the device of a tank to be removed if it is no longer reported."""
+    coordinator = getattr(config_entry, "runtime_data", None)
+    if coordinator is None:
+        return True
+    return not any(
+        domain == DOMAIN and serial_number in coordinator.data
+        for domain, serial_number in device_entry.identifiers
+    )
 
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
@@ -191,6 +434,8 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     )
     if unloaded:  # pragma: no branch
         hass.data.get(DOMAIN, {}).pop(config_entry.entry_id, None)
+        await async_release_account(hass, coordinator)
+        await async_release_http_client(hass)
         if hasattr(config_entry, "runtime_data"):
             del config_entry.runtime_data
         _async_delete_repair_issue(hass, config_entry)
@@ -198,7 +443,71 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     return unloaded
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove the stored tank history when an entry is deleted."""
+    await SENSiTStore(hass, config_entry.entry_id).async_remove()
+
+
 async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, config_entry)
-    await async_setup_entry(hass, config_entry)
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Apply changed options to a loaded entry, reloading it only if it must reconnect."""
+    coordinator: SENSiTDataUpdateCoordinator = config_entry.runtime_data
+    previous = coordinator.entry_options
+    changed = {
+        key
+        for key in previous.keys() | config_entry.options.keys()
+        if previous.get(key) != config_entry.options.get(key)
+    }
+    if config_entry.data != coordinator.entry_data or not changed <= LIVE_OPTIONS:
+        _LOGGER.debug("Reloading %s to apply changed credentials or options", config_entry.title)
+        hass.config_entries.async_schedule_reload(config_entry.entry_id)
+        return
+    if changed:
+        _LOGGER.debug("Applying changed options %s to %s", sorted(changed), config_entry.title)
+        coordinator.entry_options = dict(config_entry.options)
+        _async_apply_options(hass, config_entry, coordinator, changed)
+
+
+@callback
+def _async_apply_options(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: SENSiTDataUpdateCoordinator,
+    changed: set[str],
+) -> None:
+    """Apply options that do not need a new connection to the Kingspan service."""
+    options = config_entry.options
+    settings_entry = async_get_settings_entry(hass)
+    if CONF_RATE_LIMIT in changed and settings_entry is config_entry:
+        async_get_rate_limiter(hass).rate = options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)
+    if changed & {CONF_HTTP_POOL_SIZE, CONF_HTTP_IDLE_TIMEOUT} and settings_entry is config_entry:
+        http_client = async_resize_http_client(
+            hass,
+            options.get(CONF_HTTP_POOL_SIZE, DEFAULT_HTTP_POOL_SIZE),
+            options.get(CONF_HTTP_IDLE_TIMEOUT, DEFAULT_HTTP_IDLE_TIMEOUT),
+        )
+        if http_client is not None:
+            for entry in hass.config_entries.async_loaded_entries(DOMAIN):
+                for client in entry.runtime_data.clients:
+                    client.set_http_client(http_client)
+    if CONF_KINGSPAN_DEBUG in changed:
+        set_api_debug(options.get(CONF_KINGSPAN_DEBUG, False))
+    if CONF_API_CONCURRENCY in changed:
+        coordinator.api_concurrency = options.get(CONF_API_CONCURRENCY, DEFAULT_API_CONCURRENCY)
+        coordinator.async_apply_client_limits()
+    if changed & {CONF_UPDATE_INTERVAL, CONF_ADAPTIVE_POLLING}:
+        update_interval = timedelta(
+            hours=options.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
+        )
+        adaptive_polling = options.get(CONF_ADAPTIVE_POLLING, False)
+        coordinator.level_ttl = _level_ttl(update_interval, adaptive_polling)
+        coordinator.async_apply_client_limits()
+        coordinator.async_set_update_interval(update_interval, adaptive_polling)
+    if CONF_USAGE_WINDOW in changed:
+        coordinator.async_set_usage_window(options.get(CONF_USAGE_WINDOW, DEFAULT_USAGE_WINDOW))
+    if CONF_OIL_ENERGY_DENSITY in changed:
+        coordinator.async_recalculate_metrics()
@@ -0,0 +1,137 @@
+"""Kingspan account state shared between config flows and config entries."""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .api import SENSiTApiClient
+from .const import DATA_ACCOUNTS, DATA_VALIDATED_CLIENTS, DOMAIN, VALIDATED_CLIENT_TTL
+from .coordinator import SENSiTDataUpdateCoordinator
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass(slots=True)
+class SENSiTAccount:
+    """A Kingspan login shared by all config entries that use it."""
+
+    client: SENSiTApiClient
+    coordinators: list[SENSiTDataUpdateCoordinator] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ValidatedClient:
+    """A client logged in by a config flow and waiting to be claimed by setup."""
+
+    client: SENSiTApiClient
+    cancel_expiry: CALLBACK_TYPE
+
+
+def account_key(username: str) -> str:
+    """Return the key identifying a Kingspan account."""
+    return username.casefold()
+
+
+@callback
+def async_get_account(
+    hass: HomeAssistant,
+    username: str,
+    password: str,
+    create_client: Callable[[], SENSiTApiClient],
+) -> SENSiTAccount:
+    """Return the shared account for a login, creating it if no entry uses it yet."""
+    accounts: dict[str, SENSiTAccount] = hass.data.setdefault(DATA_ACCOUNTS, {})
+    account = accounts.get(account_key(username))
+    if account is not None and account.client.has_credentials(username, password):
+        _LOGGER.debug("Sharing client for username '%s'", username)
+        return account
+    if account is not None:
+        # Entries with stale credentials for the same login poll independently
+        _LOGGER.debug("Not sharing client for username '%s' with other credentials", username)
+        return SENSiTAccount(create_client())
+
+    account = SENSiTAccount(create_client())
+    accounts[account_key(username)] = account
+    return account
+
+
+async def async_release_account(
+    hass: HomeAssistant, coordinator: SENSiTDataUpdateCoordinator
+) -> None:
+    """Stop an entry using its account, closing the client when no entries use it."""
+    if coordinator in coordinator.peers:
+        coordinator.peers.remove(coordinator)
+    if coordinator.peers:
+        # The options of the remaining entries may allow a longer TTL or more concurrency
+        coordinator.peers[0].async_apply_client_limits()
+        return
+
+    accounts: dict[str, SENSiTAccount] = hass.data.get(DATA_ACCOUNTS, {})
+    for key, account in list(accounts.items()):
+        if account.client is coordinator.api:
+            del accounts[key]
+    await coordinator.async_close()
+
+
+@callback
+def async_get_settings_entry(hass: HomeAssistant) -> ConfigEntry | None:
+    """Return the entry whose options apply to all entries, such as the rate limit.
+
+    This is the oldest entry which is not disabled.
+    """
+    entries = hass.config_entries.async_entries(
+        DOMAIN, include_ignore=False, include_disabled=False
+    )
+    return entries[0] if entries else None
+
+
+@callback
+def async_add_validated_client(hass: HomeAssistant, username: str, client: SENSiTApiClient) -> None:
+    """Keep a client whose credentials were checked so that setup can reuse its session.
+
+    The client is closed if no setup claims it within VALIDATED_CLIENT_TTL, for example
+    because the flow was abandoned or setup failed before reaching the account.
+    """
+    clients: dict[str, ValidatedClient] = hass.data.setdefault(DATA_VALIDATED_CLIENTS, {})
+    key = account_key(username)
+    previous = clients.pop(key, None)
+    if previous is not None:
+        previous.cancel_expiry()
+        hass.async_create_background_task(previous.client.async_close(), "close unclaimed session")
+
+    @callback
+    def _async_expire(_now: datetime) -> None:
+        validated = clients.get(key)
+        if validated is None or validated.client is not client:
+            return
+        _LOGGER.debug("Closing validated session for username '%s' not claimed by setup", username)
+        del clients[key]
+        hass.async_create_background_task(client.async_close(), "close unclaimed session")
+
+    cancel_expiry = async_call_later(
+        hass,
+        VALIDATED_CLIENT_TTL,
+        HassJob(_async_expire, "expire validated session", cancel_on_shutdown=True),
+    )
+    clients[key] = ValidatedClient(client, cancel_expiry)
+
+
+async def async_pop_validated_client(
+    hass: HomeAssistant, username: str, password: str
+) -> SENSiTApiClient | None:
+    """Return the client validated by a config flow for these credentials, if there is one."""
+    clients: dict[str, ValidatedClient] = hass.data.get(DATA_VALIDATED_CLIENTS, {})
+    validated = clients.pop(account_key(username), None)
+    if validated is None:
+        return None
+    validated.cancel_expiry()
+    if not validated.client.has_credentials(username, password):
+        _LOGGER.debug("Discarding validated session for different credentials")
+        await validated.client.async_close()
+        return None
+    return validated.client
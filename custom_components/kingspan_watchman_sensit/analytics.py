@@ -0,0 +1,297 @@
+"""Usage analytics for Kingspan Watchman SENSiT tank history."""
+
+import math
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import StrEnum
+
+from homeassistant.util.dt import as_local, utc_from_timestamp
+
+from .const import REFILL_THRESHOLD, ROLLING_USAGE_WINDOW, USAGE_PERCENTILES, USAGE_WINDOWS
+from .history import TankHistory, filter_history, window_start
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+class AnalyticsBackend(StrEnum):
+    """Implementations available for calculating analytics."""
+
+    PYTHON = "python"
+    NUMPY = "numpy"
+
+
+# NumPy overheads outweigh its benefits for short usage windows
+NUMPY_MIN_READINGS = 100
+
+# Daylight saving changes are assumed to be further apart than this
+OFFSET_LOOKUP_MAX_SPAN = 14 * 86400  # seconds
+OFFSET_LOOKUP_READINGS = 7
+
+
+@dataclass(frozen=True, slots=True)
+class TankAnalytics:
+    """Usage statistics calculated from the recent history of a tank."""
+
+    usage_rate: float = 0.0
+    forecast_empty: int = 0
+    refill_count: int = 0
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+    usage_percentiles: dict[int, float] = field(default_factory=dict)
+    rolling_usage: tuple[float, ...] = ()
+    weekday_usage: dict[int, float] = field(default_factory=dict)
+    window_usage: dict[int, float] = field(default_factory=dict)
+
+
+class UsageIndex:
+    """Running totals of the usage between a tank's readings, excluding refills.
+
+    Readings are indexed once as they are added to the history, after which the
+    average usage over any recent window is found by a binary search for the
+    first reading in the window and a subtraction of totals.
+    """
+
+    __slots__ = ("_counts", "_history", "_totals")
+
+    def __init__(self) -> None:
+        self._history: TankHistory | None = None
+        # Usage and number of usage readings up to and including each reading
+        self._totals = array("d")
+        self._counts = array("q")
+
+    def update(self, history: TankHistory) -> None:
+        """Index the readings added to a tank's history since the last update."""
+        if history is not self._history or len(history) < len(self._totals):
+            self._history = history
+            self._totals = array("d")
+            self._counts = array("q")
+
+        levels = history.levels
+        total = self._totals[-1] if self._totals else 0.0
+        count = self._counts[-1] if self._counts else 0
+        for idx in range(len(self._totals), len(levels)):
+            # Ignore refill days where oil goes up significantly
+            if (
+                idx > 0
+                and levels[idx - 1] != 0
+                and levels[idx] / levels[idx - 1] < REFILL_THRESHOLD
+            ):
+                total += levels[idx - 1] - levels[idx]
+                count += 1
+            self._totals.append(total)
+            self._counts.append(count)
+
+    def usage_rate(self, usage_window: int) -> float:
+        """Return the average usage between readings over a recent window of days."""
+        if self._history is None or not self._totals:
+            return 0.0
+        first = bisect_left(self._history.timestamps, window_start(usage_window))
+        if first >= len(self._totals):
+            return 0.0
+        count = self._counts[-1] - self._counts[first]
+        return (self._totals[-1] - self._totals[first]) / count if count else 0.0
+
+    def window_usage(self, usage_windows: Iterable[int]) -> dict[int, float]:
+        """Return the average usage over each of several recent windows of days."""
+        return {usage_window: self.usage_rate(usage_window) for usage_window in usage_windows}
+
+
+@dataclass(slots=True)
+class _UsageStatistics:
+    """Statistics over the daily usage between readings in a window."""
+
+    usage_rate: float
+    refill_count: int
+    usage_percentiles: dict[int, float]
+    rolling_usage: tuple[float, ...]
+    weekday_usage: dict[int, float]
+
+
+def analyse_history(
+    history: TankHistory | None,
+    usage_window: int,
+    backend: AnalyticsBackend | None = None,
+    usage_index: UsageIndex | None = None,
+) -> TankAnalytics:
+    """Calculate usage and forecast in a single pass over the usage window.
+
+    If no backend is given, NumPy is used for long windows when it is installed.
+    If a usage index for the history is given, the usage over each of the fixed
+    windows and the usage window is also included.
+    """
+    window_usage: dict[int, float] = {}
+    if usage_index is not None and history is not None:
+        usage_index.update(history)
+        window_usage = usage_index.window_usage(sorted({*USAGE_WINDOWS, usage_window}))
+
+    window = filter_history(history, usage_window)
+    if len(window) == 0:
+        return TankAnalytics(window_usage=window_usage)
+
+    if backend is None:
+        use_numpy = np is not None and len(window) >= NUMPY_MIN_READINGS
+        backend = AnalyticsBackend.NUMPY if use_numpy else AnalyticsBackend.PYTHON
+    if backend == AnalyticsBackend.NUMPY:
+        statistics = _usage_statistics_numpy(window)
+    else:
+        statistics = _usage_statistics_python(window)
+
+    usage_rate = statistics.usage_rate
+    # Avoid divide by zero in corner case of no usage
+    forecast_empty = int(int(window.levels[-1]) / abs(usage_rate)) if usage_rate else 0
+    return TankAnalytics(
+        usage_rate=usage_rate,
+        forecast_empty=forecast_empty,
+        refill_count=statistics.refill_count,
+        window_start=window[0]["reading_date"],
+        window_end=window[-1]["reading_date"],
+        usage_percentiles=statistics.usage_percentiles,
+        rolling_usage=statistics.rolling_usage,
+        weekday_usage=statistics.weekday_usage,
+        window_usage=window_usage,
+    )
+
+
+def _weekday(timestamp: float) -> int:
+    """Return the local day of the week for a reading, where Monday is 0."""
+    return as_local(utc_from_timestamp(timestamp)).weekday()
+
+
+def _usage_statistics_python(window: TankHistory) -> _UsageStatistics:
+    """Calculate usage statistics one reading at a time."""
+    delta_levels: list[float] = []
+    delta_weekdays: list[int] = []
+    refill_count = 0
+    current_level = window.levels[0]
+    for timestamp, level_litres in zip(window.timestamps[1:], window.levels[1:], strict=True):
+        # Ignore refill days where oil goes up significantly
+        if current_level != 0 and (level_litres / current_level) < REFILL_THRESHOLD:
+            delta_levels.append(current_level - level_litres)
+            delta_weekdays.append(_weekday(timestamp))
+        elif level_litres > current_level:
+            refill_count += 1
+
+        current_level = level_litres
+
+    if not delta_levels:
+        return _UsageStatistics(0.0, refill_count, {}, (), {})
+
+    sorted_levels = sorted(delta_levels)
+    usage_percentiles = {
+        percent: _percentile(sorted_levels, percent) for percent in USAGE_PERCENTILES
+    }
+
+    rolling_usage: list[float] = []
+    rolling_total = sum(delta_levels[:ROLLING_USAGE_WINDOW])
+    for idx in range(ROLLING_USAGE_WINDOW, len(delta_levels) + 1):
+        if idx > ROLLING_USAGE_WINDOW:
+            rolling_total += delta_levels[idx - 1] - delta_levels[idx - ROLLING_USAGE_WINDOW - 1]
+        rolling_usage.append(rolling_total / ROLLING_USAGE_WINDOW)
+
+    weekday_totals: dict[int, list[float]] = {}
+    for weekday, delta in zip(delta_weekdays, delta_levels, strict=True):
+        weekday_totals.setdefault(weekday, []).append(delta)
+    weekday_usage = {
+        weekday: sum(deltas) / len(deltas) for weekday, deltas in sorted(weekday_totals.items())
+    }
+
+    return _UsageStatistics(
+        usage_rate=sum(delta_levels) / len(delta_levels),
+        refill_count=refill_count,
+        usage_percentiles=usage_percentiles,
+        rolling_usage=tuple(rolling_usage),
+        weekday_usage=weekday_usage,
+    )
+
+
+def _usage_statistics_numpy(window: TankHistory) -> _UsageStatistics:
+    """Calculate usage statistics with vectorised NumPy operations."""
+    if np is None:  # pragma: no cover
+        return _usage_statistics_python(window)
+
+    # The history arrays are wrapped without copying
+    levels = np.frombuffer(window.levels, dtype=np.float64)
+    timestamps = np.frombuffer(window.timestamps, dtype=np.float64)
+    previous_levels = levels[:-1]
+    current_levels = levels[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = current_levels / previous_levels
+    # Ignore refill days where oil goes up significantly
+    used = (previous_levels != 0) & (ratios < REFILL_THRESHOLD)
+    refill_count = int(np.count_nonzero(~used & (current_levels > previous_levels)))
+
+    delta_levels = (previous_levels - current_levels)[used]
+    if delta_levels.size == 0:
+        return _UsageStatistics(0.0, refill_count, {}, (), {})
+
+    percentiles = np.percentile(delta_levels, USAGE_PERCENTILES)
+    usage_percentiles = {
+        percent: float(value) for percent, value in zip(USAGE_PERCENTILES, percentiles, strict=True)
+    }
+
+    rolling_usage: tuple[float, ...] = ()
+    if delta_levels.size >= ROLLING_USAGE_WINDOW:
+        cumulative = np.concatenate(([0.0], np.cumsum(delta_levels)))
+        rolling = (
+            cumulative[ROLLING_USAGE_WINDOW:] - cumulative[:-ROLLING_USAGE_WINDOW]
+        ) / ROLLING_USAGE_WINDOW
+        rolling_usage = tuple(float(value) for value in rolling)
+
+    weekdays = _local_weekdays(timestamps[1:][used])
+    weekday_counts = np.bincount(weekdays, minlength=7)
+    weekday_totals = np.bincount(weekdays, weights=delta_levels, minlength=7)
+    weekday_usage = {
+        weekday: float(weekday_totals[weekday] / weekday_counts[weekday])
+        for weekday in np.flatnonzero(weekday_counts).tolist()
+    }
+
+    return _UsageStatistics(
+        usage_rate=float(delta_levels.mean()),
+        refill_count=refill_count,
+        usage_percentiles=usage_percentiles,
+        rolling_usage=rolling_usage,
+        weekday_usage=weekday_usage,
+    )
+
+
+def _utc_offset(timestamp: float) -> float:
+    """Return the local UTC offset in seconds at the time of a reading."""
+    offset = as_local(utc_from_timestamp(timestamp)).utcoffset()
+    return offset.total_seconds() if offset is not None else 0.0
+
+
+def _local_weekdays(timestamps: "np.ndarray") -> "np.ndarray":
+    """Return the local day of the week for readings, where Monday is 0.
+
+    UTC offsets are looked up at the ends of short runs of readings and only
+    looked up for each reading in a run if daylight saving changes within it.
+    """
+    offsets = np.empty(timestamps.size)
+    for start in range(0, timestamps.size, OFFSET_LOOKUP_READINGS):
+        end = min(start + OFFSET_LOOKUP_READINGS, timestamps.size)
+        start_offset = _utc_offset(timestamps[start])
+        if (
+            timestamps[end - 1] - timestamps[start] < OFFSET_LOOKUP_MAX_SPAN
+            and _utc_offset(timestamps[end - 1]) == start_offset
+        ):
+            offsets[start:end] = start_offset
+        else:
+            offsets[start:end] = [_utc_offset(timestamp) for timestamp in timestamps[start:end]]
+
+    local_days = np.floor((timestamps + offsets) / 86400).astype(np.int64)
+    # 1 January 1970 was a Thursday
+    return (local_days + 3) % 7
+
+
+def _percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Return a percentile of sorted values using linear interpolation."""
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
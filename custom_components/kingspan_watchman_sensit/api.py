@@ -2,12 +2,15 @@
 
 # pylint: disable=too-many-instance-attributes
 
+import asyncio
 import inspect
 import logging
+import time
 import traceback
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import TypedDict, cast
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
 
 from async_timeout import timeout
 from connectsensor import __version__ as api_version
@@ -17,20 +20,28 @@ from connectsensor.exceptions import (
     KingspanInvalidCredentialsError,
     KingspanTimeoutError,
 )
+from connectsensor.tank import AsyncTank
+from homeassistant.util import dt as dt_util
 from homeassistant.util.dt import as_local  # noqa: E402
+from httpx import AsyncClient
 from httpx import TimeoutException as httpxTimeoutException
 
-from .const import API_TIMEOUT, DEFAULT_USAGE_WINDOW, REFILL_THRESHOLD  # noqa: E402
+from .analytics import TankAnalytics, UsageIndex, analyse_history
+from .const import (  # noqa: E402
+    API_TIMEOUT,
+    DEFAULT_API_CONCURRENCY,
+    DEFAULT_USAGE_WINDOW,
+    METADATA_TTL,
+    SESSION_MAX_AGE,
+)
+from .history import TankHistory, TankHistoryPoint
+from .resilience import CircuitBreaker, CircuitState, RateLimiter, is_outage_error
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 _LOGGER.debug("AsyncSensorClient loaded from %s", inspect.getfile(AsyncSensorClient))
 
-
-class TankHistoryPoint(TypedDict):
-    """Single point of tank history returned by the Kingspan API."""
-
-    level_litres: float
-    reading_date: datetime
+# Error messages from the Kingspan API which mean the session must be re-established
+SESSION_ERROR_MARKERS = ("authentication failed", "invalid token")
 
 
 @dataclass(slots=True)
@@ -43,9 +54,64 @@ class TankData:
     name: str = ""
     capacity: float = 0.0
     last_read: datetime | None = None
-    history: list[TankHistoryPoint] | None = None
-    usage_rate: float = 0.0
-    forecast_empty: float = 0.0
+    history: TankHistory | None = None
+    analytics: TankAnalytics = field(default_factory=TankAnalytics)
+
+    @property
+    def usage_rate(self) -> float:
+        """Average daily usage over the usage window."""
+        return self.analytics.usage_rate
+
+    @property
+    def forecast_empty(self) -> int:
+        """Estimated number of days until the tank is empty."""
+        return self.analytics.forecast_empty
+
+
+@dataclass(slots=True)
+class ApiStatistics:
+    """Counters describing how the API client has used the Kingspan service."""
+
+    logins_performed: int = 0
+    logins_saved: int = 0
+    history_points_fetched: int = 0
+    refreshes_joined: int = 0
+    credential_checks_joined: int = 0
+    logins_joined: int = 0
+    history_requests_made: int = 0
+    history_requests_skipped: int = 0
+    level_requests_made: int = 0
+    level_requests_skipped: int = 0
+
+
+@dataclass(slots=True)
+class TankCache:
+    """Tank details and when they were last requested from the Kingspan API."""
+
+    level_fetched: float = float("-inf")
+    metadata_fetched: float = float("-inf")
+    serial_number: str = ""
+    model: str = ""
+    name: str = ""
+    capacity: float = 0.0
+
+
+class SingleFlight[T]:
+    """Share a single call between concurrent callers of the same operation."""
+
+    def __init__(self) -> None:
+        self._call: asyncio.Future[T] | None = None
+        self.joined = 0
+
+    async def run(self, operation: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of an operation, joining a call already in progress."""
+        if self._call is None or self._call.done():
+            self._call = asyncio.ensure_future(operation())
+        else:
+            _LOGGER.debug("Joining %s in progress", getattr(operation, "__name__", operation))
+            self.joined += 1
+        # A cancelled caller must not cancel the call for others waiting on it
+        return await asyncio.shield(self._call)
 
 
 # pylint: disable=too-many-instance-attributes
@@ -58,140 +124,416 @@ class SENSiTApiClient:
         password: str,
         usage_window: int = DEFAULT_USAGE_WINDOW,
         debug: bool = False,
+        concurrency: int = DEFAULT_API_CONCURRENCY,
     ) -> None:
         """Simple API Client for ."""
         _LOGGER.debug("API init as username=%s [API version %s]", username, api_version)
         self._username = username
         self._password = password
         self._usage_window = usage_window
+        self._concurrency = max(1, concurrency)
+        self._session: AsyncSensorClient | None = None
+        self._session_stack: AsyncExitStack | None = None
+        self._session_started = 0.0
+        self._refresh: SingleFlight[list[TankData]] = SingleFlight()
+        self._credentials_check: SingleFlight[bool] = SingleFlight()
+        self._login: SingleFlight[AsyncSensorClient] = SingleFlight()
         self.data: list[TankData] = []
+        self.history: dict[str, TankHistory] = {}
+        self._analysis_keys: dict[str, tuple[date, int]] = {}
+        self._usage_indexes: dict[str, UsageIndex] = {}
+        self._tank_cache: dict[str, TankCache] = {}
+        # Levels fetched more recently than this are reused rather than requested again
+        self.level_ttl = 0.0  # seconds
+        # Replaced by ones shared with other clients when used by an entry or flow
+        self.circuit_breaker = CircuitBreaker()
+        self.rate_limiter = RateLimiter()
+        # Pooled connections used instead of a transport for each session, if set
+        self.http_client: AsyncClient | None = None
+        self._statistics = ApiStatistics()
         if debug:
-            _LOGGER.debug("Enabling API debug")
-            connectsensor_logger = logging.getLogger("connectsensor")
-            connectsensor_logger.setLevel(logging.DEBUG)
+            set_api_debug(True)
+
+    @property
+    def usage_window(self) -> int:
+        """Number of days of history used to calculate usage and forecasts."""
+        return self._usage_window
+
+    @property
+    def concurrency(self) -> int:
+        """Maximum number of simultaneous requests when fetching tank data."""
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, concurrency: int) -> None:
+        self._concurrency = max(1, concurrency)
+
+    @property
+    def statistics(self) -> ApiStatistics:
+        """Counters describing how the client has used the Kingspan service."""
+        self._statistics.refreshes_joined = self._refresh.joined
+        self._statistics.credential_checks_joined = self._credentials_check.joined
+        self._statistics.logins_joined = self._login.joined
+        return self._statistics
 
     async def async_get_data(self) -> list[TankData]:
-        """Get tank data from the API"""
+        """Get tank data from the API, joining a request that is already in progress"""
+        return await self._refresh.run(self._async_get_data)
+
+    async def _async_get_data(self) -> list[TankData]:
+        """Get tank data from the API, mapping errors to KingspanAPIError"""
+        breaker = self.circuit_breaker
+        if not breaker.allow_request():
+            msg = f"Kingspan service unavailable, not fetching data for {self._username}"
+            _LOGGER.debug(msg)
+            raise KingspanAPIError(msg)
+
+        # Failures are only logged in full until the service is known to be down
+        log_error = _LOGGER.error if breaker.state == CircuitState.CLOSED else _LOGGER.debug
         try:
-            async with timeout(API_TIMEOUT):
-                return await self._get_tank_data()
+            data = await self._get_tank_data()
         except (KingspanTimeoutError, KingspanInvalidCredentialsError, KingspanAPIError) as e:
+            self._record_outcome(e)
             msg = f"API error fetching data for {self._username}: {e}"
-            _LOGGER.error(msg)
+            log_error(msg)
             raise KingspanAPIError(msg) from e
         except (TimeoutError, httpxTimeoutException) as e:
+            breaker.record_failure()
             msg = f"Timeout error fetching data for {self._username}: {e}"
-            _LOGGER.error(msg)
+            log_error(msg)
             raise KingspanAPIError(msg) from None
         except Exception as e:  # pylint: disable=broad-except
+            breaker.record_failure()
             tb_str = "".join(traceback.format_tb(e.__traceback__))
             msg = f"Unhandled error fetching data for {self._username}: '{e}' from {tb_str}"
-            _LOGGER.error(msg)
+            log_error(msg)
             raise KingspanAPIError(msg) from e
 
+        breaker.record_success()
+        return data
+
+    def _record_outcome(self, error: KingspanAPIError) -> None:
+        """Record a failed request with the circuit breaker if the service did not respond."""
+        if is_outage_error(error):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
     async def check_credentials(self) -> bool:
-        """Login to check credentials"""
+        """Login to check credentials, joining a check that is already in progress
+
+        Invalid credentials raise KingspanInvalidCredentialsError, a login that
+        times out raises TimeoutError and any other failure raises KingspanAPIError,
+        so that callers can tell a bad password from an unavailable service.
+        """
+        return await self._credentials_check.run(self._check_credentials)
+
+    async def _check_credentials(self) -> bool:
+        """Login to check credentials, keeping the session for the next data fetch"""
+        breaker = self.circuit_breaker
+        if not breaker.allow_request():
+            msg = f"Kingspan service unavailable, not logging in as {self._username}"
+            _LOGGER.debug(msg)
+            raise KingspanAPIError(msg)
+
         try:
-            async with timeout(API_TIMEOUT):
-                async with AsyncSensorClient(version=APIVersion.KNECT_V1) as client:
-                    await client.login(self._username, self._password)
-        except (KingspanTimeoutError, KingspanInvalidCredentialsError, KingspanAPIError) as e:
-            msg = f"API error logging in as {self._username}: {e}"
-            _LOGGER.error(msg)
-            return False
-        except (TimeoutError, httpxTimeoutException) as e:
+            await self._async_get_session()
+        except (KingspanTimeoutError, TimeoutError, httpxTimeoutException) as e:
+            breaker.record_failure()
             msg = f"Timeout error logging in as {self._username}: {e}"
             _LOGGER.error(msg)
-            return False
+            raise TimeoutError(msg) from e
+        except KingspanAPIError as e:
+            self._record_outcome(e)
+            msg = f"API error logging in as {self._username}: {e}"
+            _LOGGER.error(msg)
+            raise
         except Exception as e:  # pylint: disable=broad-except
+            breaker.record_failure()
             msg = f"Unhandled error logging in as {self._username}: {e}"
             _LOGGER.error(msg)
-            return False
+            raise KingspanAPIError(msg) from e
 
+        breaker.record_success()
         return True
 
+    def has_credentials(self, username: str, password: str) -> bool:
+        """Return true if the client logs in with the given credentials."""
+        return self._username.casefold() == username.casefold() and self._password == password
+
+    async def async_adopt_session(self, other: "SENSiTApiClient") -> None:
+        """Take over the authenticated session of another client for the same account."""
+        await self.async_close()
+        self._session = other._session  # pylint: disable=protected-access
+        self._session_stack = other._session_stack  # pylint: disable=protected-access
+        self._session_started = other._session_started  # pylint: disable=protected-access
+        self.statistics.logins_performed += other.statistics.logins_performed
+        other._session = None  # pylint: disable=protected-access
+        other._session_stack = None  # pylint: disable=protected-access
+        if self.http_client is not None and self._session is not None:
+            # Continue the session over the pooled connections and close its own transport
+            self._session._client = self.http_client  # pylint: disable=protected-access
+            if self._session_stack is not None:
+                await self._session_stack.aclose()
+            self._session_stack = AsyncExitStack()
+
+    def set_http_client(self, http_client: AsyncClient) -> None:
+        """Use a new pool of connections for the current session and later ones."""
+        if self.http_client is None:
+            return
+        self.http_client = http_client
+        if self._session is not None:
+            self._session._client = http_client  # pylint: disable=protected-access
+
+    async def async_close(self) -> None:
+        """Close the authenticated session, if there is one."""
+        if self._session_stack is None:
+            return
+        _LOGGER.debug("Closing session for username=%s", self._username)
+        session_stack = self._session_stack
+        self._session = None
+        self._session_stack = None
+        await session_stack.aclose()
+
+    async def _async_get_session(self) -> AsyncSensorClient:
+        """Return an authenticated client, logging in only when there is no usable session."""
+        session_age = time.monotonic() - self._session_started
+        if self._session is not None and session_age < SESSION_MAX_AGE * 3600:
+            self.statistics.logins_saved += 1
+            return self._session
+        return await self._login.run(self._async_login)
+
+    async def _async_login(self) -> AsyncSensorClient:
+        """Log in, replacing any existing session."""
+        # Sessions are refreshed periodically so that new tanks on the account are found
+        await self.async_close()
+        session_stack = AsyncExitStack()
+        try:
+            if self.http_client is not None:
+                # Log in over the pooled connections rather than creating a new transport
+                client = AsyncSensorClient(version=APIVersion.KNECT_V1)
+                client._client = self.http_client  # pylint: disable=protected-access
+            else:
+                client = await session_stack.enter_async_context(
+                    AsyncSensorClient(version=APIVersion.KNECT_V1)
+                )
+                # Close the underlying HTTP transport as the client's context manager does not
+                transport = getattr(client, "_client", None)
+                if transport is not None and hasattr(transport, "aclose"):
+                    session_stack.push_async_callback(transport.aclose)
+            await self._async_request(client.login(self._username, self._password))
+        except BaseException:
+            await session_stack.aclose()
+            raise
+
+        _LOGGER.debug("Logged in as username=%s", self._username)
+        self.statistics.logins_performed += 1
+        self._session = client
+        self._session_stack = session_stack
+        self._session_started = time.monotonic()
+        return client
+
+    async def _async_request[T](self, request: Awaitable[T]) -> T:
+        """Make a request to the Kingspan service once the rate limiter allows it.
+
+        The timeout starts once the request is made, so time spent waiting for
+        the rate limiter is not mistaken for the service failing to respond.
+        """
+        await self.rate_limiter.acquire()
+        async with timeout(API_TIMEOUT):
+            return await request
+
     async def _get_tank_data(self) -> list[TankData]:
         """Fetch and parse all tank data from the API."""
         _LOGGER.debug("Fetching tank data with username=%s", self._username)
-        async with AsyncSensorClient(version=APIVersion.KNECT_V1) as client:
-            await client.login(self._username, self._password)
-            tanks = await client.tanks
-            self.data = []
-            for tank in tanks:
-                tank_data = TankData()
-                tank_data.level = await tank.level
-                tank_data.serial_number = await tank.serial_number
-                tank_data.model = await tank.model
-                tank_data.name = await tank.name
-                tank_data.capacity = await tank.capacity
-                tank_data.last_read = as_local(await tank.last_read)
-                tank_data.history = await tank.history()
-                if len(tank_data.history) == 0:
-                    _LOGGER.warning("No history: usage and forecast unavailable")
-                    tank_data.usage_rate = 0
-                    tank_data.forecast_empty = 0
-                else:
-                    tank_data.usage_rate = self.usage_rate(tank_data)
-                    tank_data.forecast_empty = self.forecast_empty(tank_data)
-                _LOGGER.debug(
-                    "Tank data: level=%d, capacity=%d, serial_number=%s,"
-                    + "last_read=%s, usage_rate=%.1f, forecast_empty=%s",
-                    tank_data.level,
-                    tank_data.capacity,
+        client = await self._async_get_session()
+        try:
+            return await self._fetch_tank_data(client)
+        except KingspanAPIError as e:
+            if not is_session_error(e):
+                raise
+            _LOGGER.debug("Session for username=%s expired: %s", self._username, e)
+
+        await self.async_close()
+        client = await self._async_get_session()
+        return await self._fetch_tank_data(client)
+
+    async def _fetch_tank_data(self, client: AsyncSensorClient) -> list[TankData]:
+        """Fetch and parse all tank data using an authenticated client."""
+        tanks = await client.tanks
+        semaphore = asyncio.Semaphore(self._concurrency)
+        previous = {tank_data.serial_number: tank_data for tank_data in self.data}
+        self.data = list(
+            await asyncio.gather(*[self._fetch_tank(tank, semaphore, previous) for tank in tanks])
+        )
+        return self.data
+
+    async def _fetch_tank(
+        self, tank: AsyncTank, semaphore: asyncio.Semaphore, previous: dict[str, TankData]
+    ) -> TankData:
+        """Fetch and parse the data for a single tank."""
+
+        async def limited[T](request: Awaitable[T]) -> T:
+            async with semaphore:
+                return await self._async_request(request)
+
+        # pylint: disable=protected-access
+        cache = self._tank_cache.setdefault(tank._signalman_no, TankCache())
+        now = time.monotonic()
+        metadata_expired = now - cache.metadata_fetched >= METADATA_TTL * 3600
+        if metadata_expired or now - cache.level_fetched >= self.level_ttl:
+            # Tanks cache their latest level so it must be expired on a long-lived session
+            tank._level_data = None
+
+        # The level request also returns the tank's details, so the remaining
+        # attributes are read from the tank's cache without further requests
+        if tank._level_data is None:
+            self.statistics.level_requests_made += 1
+            cache.level_fetched = now
+            level = await limited(tank.level)
+        else:
+            self.statistics.level_requests_skipped += 1
+            level = await tank.level
+        # pylint: enable=protected-access
+        if metadata_expired:
+            cache.serial_number = await tank.serial_number
+            cache.model = await tank.model
+            cache.name = await tank.name
+            cache.capacity = await tank.capacity
+            cache.metadata_fetched = now
+        serial_number = cache.serial_number
+        last_read = as_local(await tank.last_read)
+
+        # History only changes when the tank reports a new reading
+        previous_data = previous.get(serial_number)
+        history = self.history.get(serial_number)
+        if (
+            previous_data is not None
+            and previous_data.last_read == last_read
+            and history is not None
+            and len(history) > 0
+        ):
+            _LOGGER.debug("No new readings for tank %s since %s", serial_number, last_read)
+            self.statistics.history_requests_skipped += 1
+        else:
+            self.statistics.history_requests_made += 1
+            history = await limited(self._sync_history(tank, serial_number))
+            previous_data = None
+
+        tank_data = TankData(
+            level=level,
+            serial_number=serial_number,
+            model=cache.model,
+            name=cache.name,
+            capacity=cache.capacity,
+            last_read=last_read,
+            history=history,
+            analytics=self._analyse(serial_number, history, previous_data),
+        )
+        if len(history) == 0:
+            _LOGGER.warning("No history: usage and forecast unavailable")
+        _LOGGER.debug(
+            "Tank data: level=%d, capacity=%d, serial_number=%s,"
+            + "last_read=%s, usage_rate=%.1f, forecast_empty=%s",
+            tank_data.level,
+            tank_data.capacity,
+            tank_data.serial_number,
+            tank_data.last_read,
+            tank_data.usage_rate,
+            tank_data.forecast_empty,
+        )
+        _LOGGER.debug("Found tank name '%s'", tank_data.name)
+        return tank_data
+
+    def _analyse(
+        self, serial_number: str, history: TankHistory, previous_data: TankData | None
+    ) -> TankAnalytics:
+        """Calculate analytics, reusing those from earlier today if history has not changed."""
+        analysis_key = (dt_util.now().date(), self._usage_window)
+        if previous_data is not None and self._analysis_keys.get(serial_number) == analysis_key:
+            return previous_data.analytics
+        self._analysis_keys[serial_number] = analysis_key
+        return self._analyse_history(serial_number, history, self._usage_window)
+
+    def _analyse_history(
+        self, serial_number: str, history: TankHistory | None, usage_window: int
+    ) -> TankAnalytics:
+        """Calculate analytics, updating the tank's usage index with any new readings."""
+        usage_index = self._usage_indexes.setdefault(serial_number, UsageIndex())
+        return analyse_history(history, usage_window, usage_index=usage_index)
+
+    async def _sync_history(self, tank: AsyncTank, serial_number: str) -> TankHistory:
+        """Merge readings newer than the stored history for a tank into the store."""
+        history = self.history.setdefault(serial_number, TankHistory())
+        last_reading_date = history.last_reading_date
+        new_points: list[TankHistoryPoint]
+        if last_reading_date is not None:
+            # API expects naive datetime in local time
+            start_date = last_reading_date.replace(tzinfo=None) + timedelta(seconds=1)
+            new_points = await tank.history(start_date=start_date)
+        else:
+            _LOGGER.debug("Fetching full history for tank %s", serial_number)
+            new_points = await tank.history()
+
+        self.statistics.history_points_fetched += history.extend(new_points)
+        return history
+
+    def restore_data(self, tanks: list[TankData]) -> list[TankData]:
+        """Restore tank data saved by a previous refresh, recalculating analytics from history."""
+        self.data = [
+            replace(
+                tank_data,
+                history=self.history.get(tank_data.serial_number),
+                analytics=self._analyse_history(
                     tank_data.serial_number,
-                    tank_data.last_read,
-                    tank_data.usage_rate,
-                    tank_data.forecast_empty,
+                    self.history.get(tank_data.serial_number),
+                    self._usage_window,
+                ),
+            )
+            for tank_data in tanks
+        ]
+        return self.data
+
+    def set_usage_window(self, usage_window: int) -> list[TankData]:
+        """Recalculate analytics for the latest tank data from its history over a new window."""
+        self._usage_window = usage_window
+        analysis_key = (dt_util.now().date(), usage_window)
+        data = []
+        for tank_data in self.data:
+            data.append(
+                replace(
+                    tank_data,
+                    analytics=self._analyse_history(
+                        tank_data.serial_number, tank_data.history, usage_window
+                    ),
                 )
-                _LOGGER.debug("Found tank name '%s'", tank_data.name)
-                self.data.append(tank_data)
-            return self.data
+            )
+            self._analysis_keys[tank_data.serial_number] = analysis_key
+        self.data = data
+        return self.data
+
+    def analyse(self, tank_data: TankData, usage_window: int) -> TankAnalytics:
+        """Calculate analytics for tank data over a usage window other than the client's."""
+        return self._analyse_history(tank_data.serial_number, tank_data.history, usage_window)
 
     def usage_rate(self, tank_data: TankData) -> float:
         """Calculate the average usage rate over the configured window."""
-        history = filter_history(tank_data.history, self._usage_window)
-        if len(history) == 0:
-            return 0.0
+        return analyse_history(tank_data.history, self._usage_window).usage_rate
 
-        delta_levels: list[float] = []
-        current_level = history[0]["level_litres"]
-        for row in history[1:]:
-            # Ignore refill days where oil goes up significantly
-            if current_level != 0 and (row["level_litres"] / current_level) < REFILL_THRESHOLD:
-                delta_levels.append(current_level - row["level_litres"])
+    def forecast_empty(self, tank_data: TankData) -> int:
+        """Estimate how many days until the tank is empty."""
+        return analyse_history(tank_data.history, self._usage_window).forecast_empty
 
-            current_level = row["level_litres"]
 
-        if len(delta_levels) > 0:
-            return sum(delta_levels) / len(delta_levels)
-        return 0.0
+def set_api_debug(enabled: bool) -> None:
+    """Enable or disable debug logging in the Kingspan API library."""
+    _LOGGER.debug("%s API debug", "Enabling" if enabled else "Disabling")
+    connectsensor_logger = logging.getLogger("connectsensor")
+    connectsensor_logger.setLevel(logging.DEBUG if enabled else logging.NOTSET)
 
-    def forecast_empty(self, tank_data: TankData) -> int:
-        """Estimate how many days until the tank is empty."""
-        history = filter_history(tank_data.history, self._usage_window)
-        if len(history) == 0:
-            return 0
-
-        rate = self.usage_rate(tank_data)
-        if rate == 0:  # pragma: no cover
-            # Avoid divide by zero in corner case of no usage
-            return 0
-
-        current_level = int(history[-1]["level_litres"])
-        return int(current_level / abs(rate))
-
-
-def filter_history(
-    history: list[TankHistoryPoint] | None, usage_window: int
-) -> list[TankHistoryPoint]:
-    """Filter tank history to a smaller recent window of days."""
-    if history is None:
-        return []
-
-    time_delta = as_local(datetime.today() - timedelta(days=usage_window))
-    # API returns naive datetime rather than with timezones
-    filtered_history: list[TankHistoryPoint] = []
-    for point in history:
-        converted = {**point, "reading_date": as_local(point["reading_date"])}
-        filtered_history.append(cast(TankHistoryPoint, converted))
-    return [point for point in filtered_history if point["reading_date"] >= time_delta]
+
+def is_session_error(error: Exception) -> bool:
+    """Return true if an API error means that the session must be re-established."""
+    if isinstance(error, KingspanInvalidCredentialsError):
+        return True
+    return any(marker in str(error).lower() for marker in SESSION_ERROR_MARKERS)
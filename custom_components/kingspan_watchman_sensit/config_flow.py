@@ -8,21 +8,36 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 
-from .api import SENSiTApiClient
+from .accounts import async_add_validated_client, async_get_settings_entry
+from .api import KingspanInvalidCredentialsError, SENSiTApiClient
 from .const import (
+    CONF_ACCOUNTS,
+    CONF_ADAPTIVE_POLLING,
+    CONF_ADD_ANOTHER,
+    CONF_API_CONCURRENCY,
+    CONF_FLEET,
+    CONF_HTTP_IDLE_TIMEOUT,
+    CONF_HTTP_POOL_SIZE,
     CONF_KINGSPAN_DEBUG,
     CONF_NAME,
     CONF_OIL_ENERGY_DENSITY,
     CONF_PASSWORD,
+    CONF_RATE_LIMIT,
     CONF_UPDATE_INTERVAL,
     CONF_USAGE_WINDOW,
     CONF_USERNAME,
+    DEFAULT_API_CONCURRENCY,
+    DEFAULT_HTTP_IDLE_TIMEOUT,
+    DEFAULT_HTTP_POOL_SIZE,
     DEFAULT_OIL_ENERGY_DENSITY,
+    DEFAULT_RATE_LIMIT,
     DEFAULT_TANK_NAME,
     DEFAULT_UPDATE_INTERVAL,
     DEFAULT_USAGE_WINDOW,
     DOMAIN,
+    MIN_RATE_LIMIT,
 )
+from .resilience import async_get_circuit_breaker, async_get_rate_limiter, is_outage_error
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -38,6 +53,7 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         """Initialize."""
         self._errors = {}
+        self._fleet_data: dict[str, Any] = {}
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -52,10 +68,10 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 self._abort_if_unique_id_configured()
 
             password = user_input[CONF_PASSWORD]
-            valid = await self._test_credentials(username, password)
-            if not valid:
+            error = await self._test_credentials(username, password)
+            if error is not None:
                 _LOGGER.debug("login failed for username '%s'", username)
-                self._errors["base"] = "auth"
+                self._errors["base"] = error
             else:
                 if self.source == config_entries.SOURCE_REAUTH:
                     _LOGGER.debug("reauthorized username '%s'", username)
@@ -69,11 +85,49 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                         },
                     )
 
+                if user_input.pop(CONF_FLEET, False):
+                    self._fleet_data = user_input
+                    return await self.async_step_fleet_account()
+
                 # Normal first-time setup
                 return self.async_create_entry(title=username, data=user_input)
 
         return await self._show_config_form(user_input)
 
+    async def async_step_fleet_account(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Add another account to a fleet of accounts polled as one entry."""
+        self._errors = {}
+
+        if user_input is not None:
+            username = user_input[CONF_USERNAME]
+            password = user_input[CONF_PASSWORD]
+            error = await self._test_credentials(username, password)
+            if error is not None:
+                _LOGGER.debug("login failed for username '%s'", username)
+                self._errors["base"] = error
+            else:
+                accounts = self._fleet_data.setdefault(CONF_ACCOUNTS, [])
+                accounts.append({CONF_USERNAME: username, CONF_PASSWORD: password})
+                if not user_input.get(CONF_ADD_ANOTHER, False):
+                    return self.async_create_entry(
+                        title=f"{self._fleet_data[CONF_USERNAME]} (+{len(accounts)})",
+                        data=self._fleet_data,
+                    )
+
+        return self.async_show_form(
+            step_id="fleet_account",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_USERNAME): str,
+                    vol.Required(CONF_PASSWORD): str,
+                    vol.Optional(CONF_ADD_ANOTHER, default=False): bool,
+                }
+            ),
+            errors=self._errors,
+        )
+
     async def async_step_reconfigure(
         self, user_input: dict[str, Any] | None = None
     ) -> config_entries.ConfigFlowResult:
@@ -84,10 +138,10 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             username = user_input[CONF_USERNAME]
             password = user_input[CONF_PASSWORD]
-            valid = await self._test_credentials(username, password)
-            if not valid:
+            error = await self._test_credentials(username, password)
+            if error is not None:
                 _LOGGER.debug("login failed for username '%s'", username)
-                self._errors["base"] = "auth"
+                self._errors["base"] = error
             else:
                 _LOGGER.debug("reconfigured username '%s'", username)
                 return self.async_update_reload_and_abort(
@@ -156,6 +210,11 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                         CONF_NAME,
                         default=defaults.get(CONF_NAME, DEFAULT_TANK_NAME),
                     ): str,
+                    **(
+                        {vol.Optional(CONF_FLEET, default=False): bool}
+                        if step_id == "user" and self.source == config_entries.SOURCE_USER
+                        else {}
+                    ),
                 }
             ),
             errors=self._errors,
@@ -165,15 +224,23 @@ class SENSiTFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Return whether this flow matches another flow."""
         return False
 
-    async def _test_credentials(self, username: str, password: str) -> bool:
-        """Return true if credentials is valid."""
+    async def _test_credentials(self, username: str, password: str) -> str | None:
+        """Log in with the credentials, returning the error to show if that fails."""
+        client = SENSiTApiClient(username, password)
+        # Flows share the entries' circuit breaker so they do not log in during an outage
+        client.circuit_breaker = async_get_circuit_breaker(self.hass)
+        client.rate_limiter = async_get_rate_limiter(self.hass)
         try:
-            client = SENSiTApiClient(username, password)
-            _ = await client.async_get_data()
-            return True
-        except Exception:  # pylint: disable=broad-except
-            pass
-        return False
+            valid = await client.check_credentials()
+        except KingspanInvalidCredentialsError:
+            return "auth"
+        except Exception as e:  # pylint: disable=broad-except
+            return "cannot_connect" if is_outage_error(e) else "auth"
+        if not valid:
+            return "auth"
+        # Setup of the new or reloaded entry continues with this login's session
+        async_add_validated_client(self.hass, username, client)
+        return None
 
 
 class OptionsFlowHandler(config_entries.OptionsFlow):
@@ -207,6 +274,42 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_OIL_ENERGY_DENSITY, DEFAULT_OIL_ENERGY_DENSITY
                 ),
             ): cv.positive_float,
+            vol.Optional(
+                CONF_API_CONCURRENCY,
+                default=self.config_entry.options.get(
+                    CONF_API_CONCURRENCY, DEFAULT_API_CONCURRENCY
+                ),
+            ): cv.positive_int,
+        }
+        # Options for all entries are only offered by the entry that sets them
+        if async_get_settings_entry(self.hass) is self.config_entry:
+            options[
+                vol.Optional(
+                    CONF_RATE_LIMIT,
+                    default=self.config_entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+                )
+            ] = vol.All(vol.Coerce(float), vol.Range(min=MIN_RATE_LIMIT))
+            options[
+                vol.Optional(
+                    CONF_HTTP_POOL_SIZE,
+                    default=self.config_entry.options.get(
+                        CONF_HTTP_POOL_SIZE, DEFAULT_HTTP_POOL_SIZE
+                    ),
+                )
+            ] = vol.All(vol.Coerce(int), vol.Range(min=1))
+            options[
+                vol.Optional(
+                    CONF_HTTP_IDLE_TIMEOUT,
+                    default=self.config_entry.options.get(
+                        CONF_HTTP_IDLE_TIMEOUT, DEFAULT_HTTP_IDLE_TIMEOUT
+                    ),
+                )
+            ] = cv.positive_int
+        options |= {
+            vol.Optional(
+                CONF_ADAPTIVE_POLLING,
+                default=self.config_entry.options.get(CONF_ADAPTIVE_POLLING, False),
+            ): cv.boolean,
             vol.Optional(
                 CONF_KINGSPAN_DEBUG,
                 default=self.config_entry.options.get(CONF_KINGSPAN_DEBUG, False),
@@ -7,8 +7,20 @@ MANUFACTURER = "Kingspan"
 MODEL = "Watchman SENSiT"
 DOMAIN = "kingspan_watchman_sensit"
 DOMAIN_DATA = f"{DOMAIN}_data"
+DATA_VALIDATED_CLIENTS = f"{DOMAIN}_validated_clients"
+DATA_ACCOUNTS = f"{DOMAIN}_accounts"
+DATA_CIRCUIT_BREAKER = f"{DOMAIN}_circuit_breaker"
+DATA_RATE_LIMITER = f"{DOMAIN}_rate_limiter"
+DATA_HTTP_CLIENT = f"{DOMAIN}_http_client"
+DATA_SERVICE_STATUS = f"{DOMAIN}_service_status"
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+# Version 2 saves history as columns, and its minor versions 2 and 3 add
+# the optional tanks and accounts sections
+STORAGE_VERSION = 2
+STORAGE_MINOR_VERSION = 3
+STORAGE_SAVE_DELAY = 10  # seconds
+
 ATTRIBUTION = "Data provided by https://www.connectsensor.com/"
 ISSUE_URL = "https://github.com/masaccio/ha-kingspan-watchman-sensit/issues"
 
@@ -20,11 +32,48 @@ CONF_USAGE_WINDOW = "usage_window"
 CONF_UPDATE_INTERVAL = "update_interval"
 CONF_KINGSPAN_DEBUG = "debug_kingspan"
 CONF_OIL_ENERGY_DENSITY = "oil_energy_density"
+CONF_API_CONCURRENCY = "api_concurrency"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_HTTP_POOL_SIZE = "http_pool_size"
+CONF_HTTP_IDLE_TIMEOUT = "http_idle_timeout"
+CONF_FLEET = "fleet"
+CONF_ACCOUNTS = "accounts"
+CONF_ADD_ANOTHER = "add_another"
 
 # Defaults
 API_TIMEOUT = 30  # seconds
 REFILL_THRESHOLD = 1.1  # factor considered a tank refill
+ROLLING_USAGE_WINDOW = 7  # readings
+USAGE_PERCENTILES = (25, 50, 75, 90)
+USAGE_WINDOWS = (7, 14, 30, 90)  # days, for usage sensors alongside the usage window
 DEFAULT_TANK_NAME = "My Tank"
 DEFAULT_USAGE_WINDOW = 14  # days
 DEFAULT_UPDATE_INTERVAL = 8  # hours
 DEFAULT_OIL_ENERGY_DENSITY = 9.8  # kwH per litre
+DEFAULT_API_CONCURRENCY = 4  # simultaneous requests per account
+DEFAULT_RATE_LIMIT = 5.0  # requests per second for all accounts
+MIN_RATE_LIMIT = 0.01  # requests per second
+DEFAULT_HTTP_POOL_SIZE = 10  # connections for all accounts
+DEFAULT_HTTP_IDLE_TIMEOUT = 30  # seconds
+FLEET_CONCURRENCY = 4  # accounts in a fleet polled at once
+SESSION_MAX_AGE = 24  # hours
+VALIDATED_CLIENT_TTL = 300  # seconds a config flow's session waits for setup
+METADATA_TTL = 24  # hours
+LEVEL_TTL_FACTOR = 0.9  # of the shortest poll interval
+
+# Adaptive polling
+ADAPTIVE_POLL_MARGIN = 15  # minutes after a reading is expected
+ADAPTIVE_RETRY_INTERVAL = 30  # minutes, doubled for each unchanged poll
+ADAPTIVE_MIN_INTERVAL = 15  # minutes
+ADAPTIVE_MAX_INTERVAL = 24  # hours
+CADENCE_READINGS = 10  # recent readings used to learn reporting cadence
+
+# Fixed interval polling
+POLL_JITTER = 120  # seconds either side of an entry's poll slot
+STARTUP_REFRESH_SPREAD = 300  # seconds over which entries with stored data refresh
+
+# Service outages
+CIRCUIT_FAILURE_THRESHOLD = 3  # consecutive failed requests
+CIRCUIT_BASE_BACKOFF = 60  # seconds, doubled for each failed probe
+CIRCUIT_MAX_BACKOFF = 3600  # seconds
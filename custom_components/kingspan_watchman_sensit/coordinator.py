@@ -1,19 +1,95 @@
 """DataUpdateCoordinator for Kingspan Watchman SENSiT."""
 
+import asyncio
 import logging
-from datetime import timedelta
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .api import KingspanAPIError, SENSiTApiClient, TankData
-from .const import DOMAIN
+from .const import (
+    CONF_OIL_ENERGY_DENSITY,
+    DEFAULT_OIL_ENERGY_DENSITY,
+    DOMAIN,
+    FLEET_CONCURRENCY,
+    STARTUP_REFRESH_SPREAD,
+)
+from .metrics import TankMetrics, derive_metrics
+from .scheduler import PollScheduler, poll_offset, staggered_interval
+from .store import SENSiTStore
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
-class SENSiTDataUpdateCoordinator(DataUpdateCoordinator[list[TankData]]):
+@dataclass(slots=True)
+class PollSchedule:
+    """When a config entry polls within its update interval."""
+
+    offset: float | None = None
+    jitter: float | None = None
+    next_interval: float | None = None
+
+
+@dataclass(slots=True)
+class StartupStatistics:
+    """Timings for the first states of a config entry after it is set up."""
+
+    warm_start: bool = False
+    refresh_delay: float | None = None
+    time_to_first_state: float | None = None
+    time_to_live_state: float | None = None
+
+
+@dataclass(slots=True)
+class ListenerStatistics:
+    """Counts of entity updates made and skipped because their data had not changed."""
+
+    updates: int = 0
+    updates_suppressed: int = 0
+
+
+# Fields of tank data that entities can depend on
+TANK_FIELDS = ("level", "serial_number", "model", "name", "capacity", "last_read", "analytics")
+
+
+def tanks_by_serial(tanks: Iterable[TankData]) -> dict[str, TankData]:
+    """Key tank data by serial number, so a tank seen by several accounts appears once."""
+    return {tank.serial_number: tank for tank in tanks}
+
+
+def changed_fields(
+    previous: dict[str, TankData] | None, current: dict[str, TankData] | None
+) -> set[tuple[str, str]] | None:
+    """Return the tank serial number and field of every value that has changed.
+
+    Every field of a tank that has been added or removed has changed. None is
+    returned if there is no data to compare so every entity must update.
+    """
+    if previous is None or current is None:
+        return None
+    changed = {
+        (serial_number, field)
+        for serial_number in previous.keys() ^ current.keys()
+        for field in TANK_FIELDS
+    }
+    changed.update(
+        (serial_number, field)
+        for serial_number, new in current.items()
+        if (old := previous.get(serial_number)) is not None and old is not new
+        for field in TANK_FIELDS
+        if getattr(old, field) != getattr(new, field)
+    )
+    return changed
+
+
+class SENSiTDataUpdateCoordinator(DataUpdateCoordinator[dict[str, TankData]]):
     """Class to manage fetching data from the API."""
 
     def __init__(
@@ -22,11 +98,35 @@ class SENSiTDataUpdateCoordinator(DataUpdateCoordinator[list[TankData]]):
         config_entry: ConfigEntry,
         client: SENSiTApiClient,
         update_interval: timedelta,
+        store: SENSiTStore | None = None,
     ) -> None:
         """Initialize."""
         self.api = client
+        self.clients = [client]
+        self.store = store
+        # Entry data and options currently applied to the coordinator and its clients
+        self.entry_data = dict(config_entry.data)
+        self.entry_options = dict(config_entry.options)
+        # Coordinators for all config entries sharing this client, including this one
+        self.peers: list[SENSiTDataUpdateCoordinator] = [self]
+        # The entry's own options, which may differ from those of the shared client
+        self.usage_window = client.usage_window
+        self.level_ttl = client.level_ttl
+        self.api_concurrency = client.concurrency
+        self.scheduler: PollScheduler | None = None
+        self.poll_schedule = PollSchedule()
+        self._base_interval = update_interval
         self.platforms: list[str] = []
         self._unavailable_logged = False
+        self._setup_started = time.monotonic()
+        self.startup = StartupStatistics()
+        self._metrics: dict[str, TankMetrics] = {}
+        self._metrics_data: dict[str, TankData] | None = None
+        self.listener_statistics = ListenerStatistics()
+        self._notified_data: dict[str, TankData] | None = None
+        self._notified_success = True
+        # Serial numbers of the tanks last checked against the device registry
+        self._device_serials: set[str] | None = None
         super().__init__(
             hass,
             _LOGGER,
@@ -36,16 +136,344 @@ class SENSiTDataUpdateCoordinator(DataUpdateCoordinator[list[TankData]]):
             config_entry=config_entry,
         )
 
-    async def update(self) -> list[TankData]:
+    async def async_load_stored_data(self) -> dict[str, TankData]:
+        """Seed the API client with stored history and return the last known tank data."""
+        if self.store is None:
+            return {}
+        self.api.history.update(await self.store.async_load_history())
+        return self._with_usage_window(
+            tanks_by_serial(self.api.restore_data(await self.store.async_load_tanks()))
+        )
+
+    @property
+    def energy_density(self) -> float:
+        """Energy density of heating oil configured for the entry, in kWh per litre."""
+        if self.config_entry is None:
+            return DEFAULT_OIL_ENERGY_DENSITY
+        return self.config_entry.options.get(
+            CONF_OIL_ENERGY_DENSITY,
+            self.config_entry.data.get(CONF_OIL_ENERGY_DENSITY, DEFAULT_OIL_ENERGY_DENSITY),
+        )
+
+    @property
+    def metrics(self) -> dict[str, TankMetrics]:
+        """Sensor values derived from the latest tank data, calculated once per update."""
+        if self._metrics_data is not self.data:
+            energy_density = self.energy_density
+            self._metrics = {
+                serial_number: derive_metrics(tank, energy_density)
+                for serial_number, tank in (self.data or {}).items()
+            }
+            self._metrics_data = self.data
+        return self._metrics
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners whose tank data has changed since they were last updated.
+
+        Listeners without a context are always updated, and every listener is
+        updated if the entry becomes available or unavailable.
+        """
+        changed = None
+        if self.last_update_success == self._notified_success:
+            changed = changed_fields(self._notified_data, self.data)
+        self._notified_data = dict(self.data) if self.data is not None else None
+        self._notified_success = self.last_update_success
+
+        statistics = self.listener_statistics
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or not changed.isdisjoint(context):
+                statistics.updates += 1
+                update_callback()
+            else:
+                statistics.updates_suppressed += 1
+
+    @callback
+    def async_replace_data(self, data: dict[str, TankData]) -> None:
+        """Show recalculated tank data without fetching it or rescheduling the next poll."""
+        self.data = data
+        self.async_update_listeners()
+
+    @callback
+    def async_recalculate_metrics(self) -> None:
+        """Update every entity with sensor values recalculated after the options changed."""
+        self._metrics_data = None
+        self._notified_data = None
+        self.async_update_listeners()
+
+    @callback
+    def async_set_usage_window(self, usage_window: int) -> None:
+        """Recalculate analytics from stored history over a new usage window.
+
+        The shared client calculates analytics over the usage window of the
+        first entry for the account, so all entries are updated if it changes.
+        """
+        self.usage_window = usage_window
+        if self.peers[0] is self:
+            self.api.set_usage_window(usage_window)
+        data = tanks_by_serial(self.api.data)
+        for peer in self.peers:
+            peer.async_replace_data(peer._with_usage_window(data))
+
+    @callback
+    def async_apply_client_limits(self) -> None:
+        """Apply the shortest level TTL and lowest concurrency of the entries sharing the client."""
+        for client in self.clients:
+            client.level_ttl = min(peer.level_ttl for peer in self.peers)
+            client.concurrency = min(peer.api_concurrency for peer in self.peers)
+
+    def _with_usage_window(self, data: dict[str, TankData]) -> dict[str, TankData]:
+        """Return tank data with analytics over the entry's usage window."""
+        if self.usage_window == self.api.usage_window:
+            return data
+        return {
+            serial_number: replace(
+                tank_data, analytics=self.api.analyse(tank_data, self.usage_window)
+            )
+            for serial_number, tank_data in data.items()
+        }
+
+    @callback
+    def async_set_update_interval(self, update_interval: timedelta, adaptive_polling: bool) -> None:
+        """Change how often the entry polls, rescheduling the next poll."""
+        self._base_interval = update_interval
+        self.scheduler = PollScheduler(update_interval) if adaptive_polling else None
+        if self.scheduler is not None and self.data is not None:
+            self.update_interval = self.scheduler.next_interval(self.data.values(), dt_util.now())
+        else:
+            self._stagger_next_poll()
+        if self._listeners:
+            self._schedule_refresh()
+
+    def set_first_state(self, warm_start: bool) -> None:
+        """Record how long the entry took to provide states after setup started."""
+        self.startup.warm_start = warm_start
+        self.startup.time_to_first_state = time.monotonic() - self._setup_started
+
+    async def update(self) -> dict[str, TankData]:
         """Update data via API."""
         try:
-            data = await self.api.async_get_data()
+            data = tanks_by_serial(await self._async_fetch_data())
         except KingspanAPIError as e:
-            _LOGGER.warning("KingspanAPIError during update: %s", e)
+            if self._unavailable_logged:
+                _LOGGER.debug("KingspanAPIError during update: %s", e)
+            else:
+                _LOGGER.warning("KingspanAPIError during update: %s", e)
             self._unavailable_logged = True
             raise UpdateFailed("Failed to fetch data from API") from e
 
         if self._unavailable_logged:
             _LOGGER.info("Kingspan service is available again")
             self._unavailable_logged = False
+        entry_data = self._async_data_received(data)
+        for peer in self.peers:
+            if peer is not self:
+                peer.async_receive_data(data)
+        return entry_data
+
+    @callback
+    def _stagger_next_poll(self) -> None:
+        """Schedule the next poll in the entry's slot to spread polls across the interval."""
+        offset = poll_offset(self._poll_key(), self._base_interval)
+        interval, jitter = staggered_interval(
+            offset, self._base_interval, time.time(), min_wait=self.api.level_ttl
+        )
+        self.update_interval = interval
+        self.poll_schedule = PollSchedule(offset, jitter, interval.total_seconds())
+
+    def startup_refresh_delay(self) -> float:
+        """Return how long an entry started with stored data waits before refreshing.
+
+        Entries refresh at different points in the first STARTUP_REFRESH_SPREAD
+        seconds so that a restart does not log in to every account at once.
+        """
+        self.startup.refresh_delay = poll_offset(
+            self._poll_key(), timedelta(seconds=STARTUP_REFRESH_SPREAD)
+        )
+        return self.startup.refresh_delay
+
+    def _poll_key(self) -> str:
+        """Return the key that places the entry's polls."""
+        # Entries sharing a client poll at the same time so only one of them polls
+        lead = self.peers[0] if self.peers else self
+        return lead.config_entry.entry_id if lead.config_entry is not None else DOMAIN
+
+    async def _async_fetch_data(self) -> list[TankData]:
+        """Fetch the latest tank data for the entry."""
+        return await self.api.async_get_data()
+
+    async def async_close(self) -> None:
+        """Close the entry's connections to the Kingspan service."""
+        await self.api.async_close()
+
+    @callback
+    def async_receive_data(self, data: dict[str, TankData]) -> None:
+        """Accept tank data fetched by another config entry for the same account."""
+        self.async_set_updated_data(self._async_data_received(data))
+
+    @callback
+    def _async_data_received(self, data: dict[str, TankData]) -> dict[str, TankData]:
+        """Record and save the latest tank data and choose when to poll next.
+
+        The data is returned with analytics over the entry's usage window.
+        """
+        data = self._with_usage_window(data)
+        if self.scheduler is not None:
+            self.update_interval = self.scheduler.next_interval(data.values(), dt_util.now())
+        else:
+            self._stagger_next_poll()
+        if self.startup.time_to_live_state is None:
+            self.startup.time_to_live_state = time.monotonic() - self._setup_started
+        self._async_save(data)
+        self._async_remove_stale_devices(data)
         return data
+
+    @callback
+    def _async_save(self, data: dict[str, TankData]) -> None:
+        """Schedule the history and latest tank data to be saved."""
+        if self.store is not None:
+            self.store.async_save(self.api.history, list(data.values()))
+
+    @callback
+    def _async_remove_stale_devices(self, data: dict[str, TankData]) -> None:
+        """Remove the devices of tanks that are no longer reported for the entry."""
+        if self.config_entry is None or data.keys() == self._device_serials:
+            return
+        self._device_serials = set(data)
+        entry_id = self.config_entry.entry_id
+        device_registry = dr.async_get(self.hass)
+        for device in dr.async_entries_for_config_entry(device_registry, entry_id):
+            serial_numbers = {serial for domain, serial in device.identifiers if domain == DOMAIN}
+            if serial_numbers.isdisjoint(data):
+                _LOGGER.info("Removing tank %s which is no longer reported", device.name)
+                # Entities of the device are removed with it
+                device_registry.async_update_device(device.id, remove_config_entry_id=entry_id)
+
+
+@dataclass(slots=True)
+class FleetAccountStatus:
+    """Outcome of the latest update of one account in a fleet."""
+
+    success: bool | None = None
+    latency: float | None = None
+    tank_count: int = 0
+    last_success: datetime | None = None
+    error: str | None = None
+
+
+class SENSiTFleetCoordinator(SENSiTDataUpdateCoordinator):
+    """Class to manage fetching data for several accounts as a single entry.
+
+    Accounts are polled together on one schedule with a limit on how many are
+    polled at once. Tanks for an account that fails to update keep their last
+    known data unless every account fails, and their devices are never removed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        clients: list[SENSiTApiClient],
+        update_interval: timedelta,
+        store: SENSiTStore | None = None,
+    ) -> None:
+        """Initialize."""
+        super().__init__(hass, config_entry, clients[0], update_interval, store)
+        self.clients = clients
+        self.account_status = [FleetAccountStatus() for _ in clients]
+        self._account_data: list[list[TankData]] = [[] for _ in clients]
+        # Whether the tanks reported by each account are known, from a fetch or stored data
+        self._account_known = [False for _ in clients]
+        self._semaphore = asyncio.Semaphore(FLEET_CONCURRENCY)
+        # History for all accounts is saved together, keyed by tank serial number
+        for client in clients[1:]:
+            client.history = self.api.history
+
+    async def async_load_stored_data(self) -> dict[str, TankData]:
+        """Seed each account with its stored history and return the last known tank data.
+
+        No tank data is returned if the accounts have changed since it was saved,
+        as it is not known which account reports each tank.
+        """
+        if self.store is None:
+            return {}
+        self.api.history.update(await self.store.async_load_history())
+        accounts = await self.store.async_load_accounts()
+        if len(accounts) != len(self.clients):
+            return {}
+        tanks = tanks_by_serial(await self.store.async_load_tanks())
+        for idx, (client, serial_numbers) in enumerate(zip(self.clients, accounts, strict=True)):
+            if serial_numbers is None:
+                continue
+            self._account_data[idx] = client.restore_data(
+                [tanks[serial_number] for serial_number in serial_numbers if serial_number in tanks]
+            )
+            self._account_known[idx] = True
+        return tanks_by_serial(tank_data for data in self._account_data for tank_data in data)
+
+    async def _async_fetch_data(self) -> list[TankData]:
+        """Fetch the latest tank data for every account in the fleet."""
+        await asyncio.gather(
+            *[self._async_fetch_account(idx, client) for idx, client in enumerate(self.clients)]
+        )
+        errors = [status.error for status in self.account_status if not status.success]
+        if len(errors) == len(self.clients):
+            raise KingspanAPIError(f"All accounts failed to update: {errors[0]}")
+        return [tank_data for data in self._account_data for tank_data in data]
+
+    async def _async_fetch_account(self, idx: int, client: SENSiTApiClient) -> None:
+        """Fetch the latest tank data for one account, recording its outcome."""
+        status = self.account_status[idx]
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                self._account_data[idx] = await client.async_get_data()
+            except KingspanAPIError as e:
+                status.success = False
+                status.error = str(e)
+            else:
+                self._account_known[idx] = True
+                status.success = True
+                status.error = None
+                status.last_success = dt_util.now()
+                status.tank_count = len(self._account_data[idx])
+            finally:
+                status.latency = time.monotonic() - started
+
+    @callback
+    def async_set_usage_window(self, usage_window: int) -> None:
+        """Recalculate analytics from stored history over a new usage window."""
+        self.usage_window = usage_window
+        self._account_data = [client.set_usage_window(usage_window) for client in self.clients]
+        self.async_replace_data(
+            tanks_by_serial(tank_data for data in self._account_data for tank_data in data)
+        )
+
+    @callback
+    def _async_save(self, data: dict[str, TankData]) -> None:
+        """Schedule the history, latest tank data and the tanks of each account to be saved."""
+        if self.store is None:
+            return
+        self.store.async_save(
+            self.api.history,
+            list(data.values()),
+            accounts=[
+                [tank_data.serial_number for tank_data in account_data] if known else None
+                for account_data, known in zip(self._account_data, self._account_known, strict=True)
+            ],
+        )
+
+    @callback
+    def _async_remove_stale_devices(self, data: dict[str, TankData]) -> None:
+        """Remove the devices of tanks that are no longer reported by any account.
+
+        Tanks of an account that failed to update keep their last known data, so
+        are not removed, but nothing is removed while any account has never
+        reported its tanks.
+        """
+        if all(self._account_known):
+            super()._async_remove_stale_devices(data)
+
+    async def async_close(self) -> None:
+        """Close the connections for every account in the fleet."""
+        await asyncio.gather(*[client.async_close() for client in self.clients])
@@ -7,8 +7,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .api import TankData
 from .const import ATTRIBUTION, DOMAIN, MANUFACTURER, MODEL
-from .coordinator import SENSiTDataUpdateCoordinator
+from .coordinator import TANK_FIELDS, SENSiTDataUpdateCoordinator
+from .metrics import TankMetrics
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -17,31 +19,45 @@ class SENSiTEntity(CoordinatorEntity[SENSiTDataUpdateCoordinator]):
     """Common entity behavior for Kingspan Watchman SENSiT sensors."""
 
     _attr_has_entity_name = True
+    # Fields of the tank's data that the entity's state depends on
+    _data_fields: tuple[str, ...] = TANK_FIELDS
 
     def __init__(
         self,
         coordinator: SENSiTDataUpdateCoordinator,
         config_entry: ConfigEntry,
-        idx: int,
+        serial_number: str,
     ) -> None:
         _LOGGER.debug("Init entity %s", self._attr_name)
-        super().__init__(coordinator)
+        # The coordinator only updates the entity when one of these fields changes
+        super().__init__(
+            coordinator, frozenset((serial_number, field) for field in self._data_fields)
+        )
         self.config_entry = config_entry
-        self.idx = idx
+        self.serial_number = serial_number
+
+    @property
+    def tank_data(self) -> TankData:
+        """Latest data for the entity's tank."""
+        return self.coordinator.data[self.serial_number]
+
+    @property
+    def tank_metrics(self) -> TankMetrics:
+        """Sensor values derived from the latest data for the entity's tank."""
+        return self.coordinator.metrics[self.serial_number]
 
     @cached_property
     def unique_id(self) -> str:
         """Return a unique ID to use for this entity."""
-        serial_no = self.coordinator.data[self.idx].serial_number
         name = (self._attr_name or "").lower().replace(" ", "_")
-        return f"sensit-{serial_no}-{name}"
+        return f"sensit-{self.serial_number}-{name}"
 
     @cached_property
     def device_info(self) -> DeviceInfo:
         return DeviceInfo(
-            identifiers={(DOMAIN, self.coordinator.data[self.idx].serial_number)},
+            identifiers={(DOMAIN, self.serial_number)},
             model=MODEL,
-            name=self.coordinator.data[self.idx].name,
+            name=self.tank_data.name,
             manufacturer=MANUFACTURER,
         )
 
@@ -50,7 +66,7 @@ class SENSiTEntity(CoordinatorEntity[SENSiTDataUpdateCoordinator]):
         """Return the state attributes."""
         return {
             "attribution": ATTRIBUTION,
-            "id": self.coordinator.data[self.idx].serial_number,
+            "id": self.serial_number,
             "integration": DOMAIN,
         }
 
@@ -61,4 +77,4 @@ class SENSiTEntity(CoordinatorEntity[SENSiTDataUpdateCoordinator]):
 
     @property
     def available(self) -> bool:
-        return super().available and self.idx < len(self.coordinator.data)
+        return super().available and self.serial_number in self.coordinator.data
@@ -0,0 +1,120 @@
+"""Compact storage of tank history for Kingspan Watchman SENSiT."""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from typing import Self, TypedDict, overload
+
+from homeassistant.util.dt import as_local, utc_from_timestamp
+
+
+class TankHistoryPoint(TypedDict):
+    """Single point of tank history returned by the Kingspan API."""
+
+    level_litres: float
+    reading_date: datetime
+
+
+class TankHistory:
+    """Tank history held as parallel arrays of reading timestamps and levels.
+
+    Timestamps are seconds since the epoch and are kept in ascending order. Points
+    are only converted to dicts with local datetimes when they are read.
+    """
+
+    __slots__ = ("levels", "timestamps")
+
+    def __init__(self, timestamps: Iterable[float] = (), levels: Iterable[float] = ()) -> None:
+        self.timestamps = array("d", timestamps)
+        self.levels = array("d", levels)
+        if len(self.timestamps) != len(self.levels):
+            raise ValueError("History timestamps and levels must be the same length")
+
+    @classmethod
+    def from_points(cls, points: Iterable[TankHistoryPoint]) -> Self:
+        """Create a history from API readings, which may be in any order."""
+        history = cls()
+        history.extend(points)
+        return history
+
+    def extend(self, points: Iterable[TankHistoryPoint]) -> int:
+        """Add readings newer than the last reading and return how many were added."""
+        # API returns naive datetime rather than with timezones
+        new_points = sorted(
+            (as_local(point["reading_date"]).timestamp(), float(point["level_litres"]))
+            for point in points
+        )
+        last_timestamp = self.timestamps[-1] if self.timestamps else float("-inf")
+        added = 0
+        for timestamp, level_litres in new_points:
+            if timestamp > last_timestamp:
+                self.timestamps.append(timestamp)
+                self.levels.append(level_litres)
+                last_timestamp = timestamp
+                added += 1
+        return added
+
+    @property
+    def last_reading_date(self) -> datetime | None:
+        """Return the date of the most recent reading."""
+        if not self.timestamps:
+            return None
+        return as_local(utc_from_timestamp(self.timestamps[-1]))
+
+    def as_list(self) -> list[TankHistoryPoint]:
+        """Return the history as a list of points."""
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[TankHistoryPoint]:
+        for timestamp, level_litres in zip(self.timestamps, self.levels, strict=True):
+            yield _point(timestamp, level_litres)
+
+    @overload
+    def __getitem__(self, index: int) -> TankHistoryPoint: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TankHistory": ...
+
+    def __getitem__(self, index: int | slice) -> "TankHistoryPoint | TankHistory":
+        if isinstance(index, slice):
+            window = TankHistory()
+            window.timestamps = self.timestamps[index]
+            window.levels = self.levels[index]
+            return window
+        return _point(self.timestamps[index], self.levels[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TankHistory):
+            return NotImplemented
+        return self.timestamps == other.timestamps and self.levels == other.levels
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"TankHistory({len(self)} readings)"
+
+
+def _point(timestamp: float, level_litres: float) -> TankHistoryPoint:
+    """Convert a stored reading to a history point with a local datetime."""
+    return TankHistoryPoint(
+        reading_date=as_local(utc_from_timestamp(timestamp)), level_litres=level_litres
+    )
+
+
+def window_start(usage_window: int) -> float:
+    """Return the timestamp of the start of a recent window of days."""
+    return as_local(datetime.today() - timedelta(days=usage_window)).timestamp()
+
+
+def filter_history(history: TankHistory | None, usage_window: int) -> TankHistory:
+    """Filter tank history to a smaller recent window of days."""
+    if history is None:
+        return TankHistory()
+
+    # Readings are sorted, so the start of the window is found by binary search and
+    # only the readings inside the window are copied or converted to datetimes
+    return history[bisect_left(history.timestamps, window_start(usage_window)) :]
@@ -0,0 +1,47 @@
+"""Values derived from Kingspan Watchman SENSiT tank data for sensor states."""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from .api import TankData
+
+
+@dataclass(frozen=True, slots=True)
+class TankMetrics:
+    """Sensor values for a tank, calculated once each time its data is updated."""
+
+    percent_full: Decimal | None
+    icon: str
+    usage_rate: Decimal  # litres per day
+    energy_usage: float  # kWh per day
+    energy_density: float  # kWh per litre
+    window_usage: dict[int, Decimal]  # litres per day over a number of days
+
+
+def derive_metrics(tank_data: TankData, energy_density: float) -> TankMetrics:
+    """Calculate the sensor values for a tank from its latest data."""
+    level = tank_data.level
+    capacity = tank_data.capacity
+    usage_rate = tank_data.analytics.usage_rate
+    return TankMetrics(
+        percent_full=Decimal(f"{100 * (level / capacity):.1f}") if capacity else None,
+        icon=tank_icon(level, capacity),
+        usage_rate=Decimal(f"{usage_rate:.1f}"),
+        energy_usage=round(float(usage_rate * energy_density), 1),
+        energy_density=energy_density,
+        window_usage={
+            days: Decimal(f"{rate:.1f}") for days, rate in tank_data.analytics.window_usage.items()
+        },
+    )
+
+
+def tank_icon(level: float, capacity: float) -> str:
+    """Return an icon name that reflects how full the tank is."""
+    percent_full = level / capacity if capacity else 0.0
+    if percent_full >= 0.75:
+        return "mdi:gauge-full"
+    if percent_full >= 0.5:
+        return "mdi:gauge"
+    if percent_full >= 0.25:
+        return "mdi:gauge-low"
+    return "mdi:gauge-empty"
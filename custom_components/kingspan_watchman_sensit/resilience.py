@@ -0,0 +1,257 @@
+"""Protection against Kingspan service outages and overload for Kingspan Watchman SENSiT."""
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import StrEnum
+
+from connectsensor.exceptions import (
+    KingspanAPIError,
+    KingspanInvalidCredentialsError,
+    KingspanTimeoutError,
+)
+from homeassistant.core import HomeAssistant, callback
+from httpx import HTTPError
+
+from .const import (
+    CIRCUIT_BASE_BACKOFF,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_MAX_BACKOFF,
+    DATA_CIRCUIT_BREAKER,
+    DATA_RATE_LIMITER,
+    DEFAULT_RATE_LIMIT,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Error messages which mean the Kingspan service did not respond properly or was not contacted
+OUTAGE_ERROR_MARKERS = ("http request failed", "malformed response", "service unavailable")
+
+
+class CircuitState(StrEnum):
+    """States of the circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(slots=True)
+class CircuitBreakerStatistics:
+    """State of the circuit breaker reported in diagnostics."""
+
+    state: CircuitState = CircuitState.CLOSED
+    consecutive_failures: int = 0
+    times_opened: int = 0
+    requests_rejected: int = 0
+    backoff: float | None = None
+
+
+class CircuitBreaker:
+    """Stop requests to the Kingspan service while it is unavailable.
+
+    The circuit opens after consecutive failures, and requests fail immediately
+    while it is open. After a backoff a single probe request is allowed through.
+    The circuit closes if the probe succeeds, otherwise it opens again with the
+    backoff doubled.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        base_backoff: float = CIRCUIT_BASE_BACKOFF,
+        max_backoff: float = CIRCUIT_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = max(1, failure_threshold)
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._clock = clock
+        self._retry_at = 0.0
+        self._listeners: list[Callable[[], None]] = []
+        self.statistics = CircuitBreakerStatistics()
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state of the circuit."""
+        return self.statistics.state
+
+    @property
+    def retry_in(self) -> float | None:
+        """Seconds until the next probe request is allowed, if the circuit is not closed."""
+        if self.state == CircuitState.CLOSED:
+            return None
+        return max(0.0, self._retry_at - self._clock())
+
+    def allow_request(self) -> bool:
+        """Return true if a request to the Kingspan service should be made."""
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self._clock() < self._retry_at:
+            self.statistics.requests_rejected += 1
+            return False
+
+        # Another probe is allowed if this one has not finished by the end of the backoff
+        _LOGGER.debug("Probing Kingspan service after %.0f seconds", self.statistics.backoff)
+        self._retry_at = self._clock() + (self.statistics.backoff or self._base_backoff)
+        self._set_state(CircuitState.HALF_OPEN)
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit after the Kingspan service responded."""
+        self.statistics.consecutive_failures = 0
+        if self.state != CircuitState.CLOSED:
+            _LOGGER.info("Kingspan service responded, resuming requests")
+            self.statistics.backoff = None
+            self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the circuit if the service appears to be down."""
+        self.statistics.consecutive_failures += 1
+        if self.state == CircuitState.OPEN:
+            # Requests started before the circuit opened do not extend the backoff
+            return
+        if self.state == CircuitState.CLOSED:
+            if self.statistics.consecutive_failures < self._failure_threshold:
+                return
+            backoff = self._base_backoff
+        else:
+            backoff = min(2 * (self.statistics.backoff or self._base_backoff), self._max_backoff)
+
+        # Jitter stops clients that failed together from probing together
+        self._retry_at = self._clock() + backoff * random.uniform(0.5, 1.0)  # noqa: S311
+        self.statistics.backoff = backoff
+        if self.state == CircuitState.CLOSED:
+            self.statistics.times_opened += 1
+            _LOGGER.warning(
+                "Kingspan service unavailable after %d failed requests, retrying in %.0f seconds",
+                self.statistics.consecutive_failures,
+                self._retry_at - self._clock(),
+            )
+        self._set_state(CircuitState.OPEN)
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call a function whenever the circuit changes state, returning a function to stop."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+        self.statistics.state = state
+        for listener in list(self._listeners):
+            listener()
+
+
+@dataclass(slots=True)
+class RateLimiterStatistics:
+    """State of the rate limiter reported in diagnostics."""
+
+    rate: float = DEFAULT_RATE_LIMIT
+    requests: int = 0
+    requests_delayed: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class RateLimiter:
+    """Limit the rate of requests to the Kingspan service with a token bucket.
+
+    The bucket holds up to one second of requests so that short bursts are not
+    delayed. Requests made while the bucket is empty wait in turn for a token
+    rather than failing.
+    """
+
+    def __init__(
+        self, rate: float = DEFAULT_RATE_LIMIT, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self._rate = rate
+        self._tokens = self._capacity
+        self._updated = clock()
+        # Waiters acquire the lock in the order they arrive
+        self._lock = asyncio.Lock()
+        self.statistics = RateLimiterStatistics(rate=rate)
+
+    @property
+    def _capacity(self) -> float:
+        return max(1.0, self._rate)
+
+    @property
+    def rate(self) -> float:
+        """Maximum sustained requests per second."""
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        self._refill()
+        self._rate = rate
+        self._tokens = min(self._tokens, self._capacity)
+        self.statistics.rate = rate
+
+    async def acquire(self) -> None:
+        """Wait until a request can be made."""
+        statistics = self.statistics
+        statistics.queue_depth += 1
+        statistics.max_queue_depth = max(statistics.max_queue_depth, statistics.queue_depth)
+        started = self._clock()
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    statistics.requests_delayed += 1
+                    await asyncio.sleep((1 - self._tokens) / self._rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            statistics.queue_depth -= 1
+
+        wait = self._clock() - started
+        statistics.requests += 1
+        statistics.total_wait += wait
+        statistics.max_wait = max(statistics.max_wait, wait)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """Return true if an error means the Kingspan service did not respond properly.
+
+    Errors reported by the service itself, such as invalid credentials, show
+    that it is available.
+    """
+    if isinstance(error, KingspanInvalidCredentialsError):
+        return False
+    if isinstance(error, KingspanTimeoutError | TimeoutError | HTTPError):
+        return True
+    if isinstance(error, KingspanAPIError):
+        if isinstance(error.__cause__, HTTPError):
+            return True
+        return any(marker in str(error).lower() for marker in OUTAGE_ERROR_MARKERS)
+    return True
+
+
+@callback
+def async_get_circuit_breaker(hass: HomeAssistant) -> CircuitBreaker:
+    """Return the circuit breaker shared by all clients of the Kingspan service."""
+    breaker: CircuitBreaker | None = hass.data.get(DATA_CIRCUIT_BREAKER)
+    if breaker is None:
+        breaker = hass.data[DATA_CIRCUIT_BREAKER] = CircuitBreaker()
+    return breaker
+
+
+@callback
+def async_get_rate_limiter(hass: HomeAssistant) -> RateLimiter:
+    """Return the rate limiter shared by all clients of the Kingspan service."""
+    limiter: RateLimiter | None = hass.data.get(DATA_RATE_LIMITER)
+    if limiter is None:
+        limiter = hass.data[DATA_RATE_LIMITER] = RateLimiter()
+    return limiter
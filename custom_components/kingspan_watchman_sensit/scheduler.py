@@ -0,0 +1,113 @@
+"""Poll scheduling for Kingspan Watchman SENSiT."""
+
+import hashlib
+import logging
+import math
+import random
+import statistics
+from collections.abc import Collection
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from .api import TankData
+from .const import (
+    ADAPTIVE_MAX_INTERVAL,
+    ADAPTIVE_MIN_INTERVAL,
+    ADAPTIVE_POLL_MARGIN,
+    ADAPTIVE_RETRY_INTERVAL,
+    CADENCE_READINGS,
+    POLL_JITTER,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass(slots=True)
+class SchedulerStatistics:
+    """State of the adaptive scheduler reported in diagnostics."""
+
+    cadences: dict[str, float] = field(default_factory=dict)
+    unchanged_polls: int = 0
+    next_interval: float | None = None
+
+
+class PollScheduler:
+    """Choose when to poll next from how often each tank reports readings.
+
+    Polls are made shortly after the next reading of any tank is expected. If a
+    reading is overdue, polls back off exponentially while results are unchanged.
+    """
+
+    def __init__(self, update_interval: timedelta) -> None:
+        self._update_interval = update_interval
+        self._last_reads: dict[str, datetime | None] = {}
+        self.statistics = SchedulerStatistics()
+
+    def next_interval(self, data: Collection[TankData], now: datetime) -> timedelta:
+        """Return the time to wait before the next poll after receiving data."""
+        last_reads = {tank.serial_number: tank.last_read for tank in data}
+        if last_reads == self._last_reads:
+            self.statistics.unchanged_polls += 1
+        else:
+            self.statistics.unchanged_polls = 0
+        self._last_reads = last_reads
+
+        intervals = [self._tank_interval(tank, now) for tank in data]
+        interval = min(intervals, default=self._update_interval)
+        interval = max(
+            timedelta(minutes=ADAPTIVE_MIN_INTERVAL),
+            min(interval, timedelta(hours=ADAPTIVE_MAX_INTERVAL)),
+        )
+        self.statistics.next_interval = interval.total_seconds()
+        _LOGGER.debug(
+            "Next poll in %s after %d unchanged polls", interval, self.statistics.unchanged_polls
+        )
+        return interval
+
+    def _tank_interval(self, tank: TankData, now: datetime) -> timedelta:
+        """Return the time to wait for the next reading from a single tank."""
+        cadence = reading_cadence(tank)
+        if cadence is None or tank.last_read is None:
+            return self._update_interval
+        self.statistics.cadences[tank.serial_number] = cadence.total_seconds()
+
+        expected = tank.last_read + cadence + timedelta(minutes=ADAPTIVE_POLL_MARGIN)
+        if expected > now:
+            return expected - now
+
+        # Back off while an overdue reading has still not arrived
+        backoff = timedelta(minutes=ADAPTIVE_RETRY_INTERVAL) * 2**self.statistics.unchanged_polls
+        return min(backoff, max(cadence, self._update_interval))
+
+
+def reading_cadence(tank: TankData) -> timedelta | None:
+    """Return the typical time between a tank's recent readings."""
+    if tank.history is None or len(tank.history) < 2:
+        return None
+    timestamps = tank.history.timestamps[-CADENCE_READINGS:]
+    gaps = [later - earlier for earlier, later in zip(timestamps, timestamps[1:], strict=False)]
+    return timedelta(seconds=statistics.median(gaps))
+
+
+def poll_offset(key: str, interval: timedelta) -> float:
+    """Return a deterministic offset into the poll interval for an entry, in seconds."""
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8]) / 2**64 * interval.total_seconds()
+
+
+def staggered_interval(
+    offset: float, interval: timedelta, now: float, min_wait: float = 0.0
+) -> tuple[timedelta, float]:
+    """Return the time until an entry's next poll slot and the jitter applied to it.
+
+    Poll slots are fixed points in wall-clock time, an interval apart and
+    shifted by the entry's offset, so entries with the same interval poll at
+    different times even if they were all set up at once. The next poll is
+    at least half an interval and at least min_wait seconds away, so that it
+    is not made while a level fetched by the last poll is still reused.
+    """
+    interval_seconds = interval.total_seconds()
+    earliest = now + max(interval_seconds / 2, min_wait + POLL_JITTER)
+    slot = offset + math.ceil((earliest - offset) / interval_seconds) * interval_seconds
+    jitter = random.uniform(-POLL_JITTER, POLL_JITTER)  # noqa: S311
+    return timedelta(seconds=slot - now + jitter), jitter
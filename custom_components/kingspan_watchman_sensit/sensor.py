@@ -1,8 +1,9 @@
 """Sensor platform for Kingspan Watchman SENSiT."""
 
 import logging
+from datetime import timedelta
 from decimal import Decimal
-from functools import cached_property
+from typing import Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -11,19 +12,26 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import PERCENTAGE, UnitOfEnergy, UnitOfTime, UnitOfVolume
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import dt as dt_util
 
-from .const import CONF_OIL_ENERGY_DENSITY, DEFAULT_OIL_ENERGY_DENSITY, DOMAIN
+from .const import ATTRIBUTION, DATA_SERVICE_STATUS, DOMAIN, USAGE_WINDOWS
 from .entity import SENSiTEntity
+from .resilience import CircuitBreaker, CircuitState
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 PARALLEL_UPDATES = 0
 
+SERVICE_STATUS_ICONS = {
+    CircuitState.CLOSED: "mdi:cloud-check-outline",
+    CircuitState.OPEN: "mdi:cloud-off-outline",
+    CircuitState.HALF_OPEN: "mdi:cloud-sync-outline",
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -33,19 +41,72 @@ async def async_setup_entry(
     """Setup sensor platform."""
     _LOGGER.debug("Adding sensor entities")
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
-    entities: list[SensorEntity] = []
-    for idx in range(len(coordinator.data)):
-        entities += [
-            OilLevel(coordinator, config_entry, idx),
-            TankPercentageFull(coordinator, config_entry, idx),
-            TankCapacity(coordinator, config_entry, idx),
-            LastReadDate(coordinator, config_entry, idx),
-            CurrentUsage(coordinator, config_entry, idx),
-            ForecastEmpty(coordinator, config_entry, idx),
-            CurrentEnergyUsage(coordinator, config_entry, idx),
-            OilConsumption(coordinator, config_entry, idx),
-        ]
-    async_add_entities(entities)
+    # Serial numbers of the tanks that have entities
+    added: set[str] = set()
+
+    @callback
+    def _async_add_tank_entities() -> None:
+        """Add entities for tanks that have been reported since the last update."""
+        # Tanks that are no longer reported have their devices and entities removed
+        # by the coordinator, so they are added again if they return
+        added.intersection_update(coordinator.data)
+        entities: list[SensorEntity] = []
+        for serial_number in coordinator.data:
+            if serial_number in added:
+                continue
+            entities += [
+                OilLevel(coordinator, config_entry, serial_number),
+                TankPercentageFull(coordinator, config_entry, serial_number),
+                TankCapacity(coordinator, config_entry, serial_number),
+                LastReadDate(coordinator, config_entry, serial_number),
+                CurrentUsage(coordinator, config_entry, serial_number),
+                ForecastEmpty(coordinator, config_entry, serial_number),
+                CurrentEnergyUsage(coordinator, config_entry, serial_number),
+                OilConsumption(coordinator, config_entry, serial_number),
+            ]
+            entities += [
+                WindowUsage(coordinator, config_entry, serial_number, days)
+                for days in USAGE_WINDOWS
+            ]
+            added.add(serial_number)
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_tank_entities()
+    config_entry.async_on_unload(coordinator.async_add_listener(_async_add_tank_entities))
+
+    _async_add_service_status(
+        hass, config_entry, coordinator.api.circuit_breaker, async_add_entities
+    )
+
+
+@callback
+def _async_add_service_status(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    circuit_breaker: CircuitBreaker,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Add the service status sensor unless another entry is already reporting it.
+
+    All entries share the circuit breaker, so one of them reports its state. When
+    that entry is unloaded, the next entry to have been set up takes over the sensor.
+    """
+    # Entries able to add the sensor, with the one reporting it first
+    reporters: dict[str, AddEntitiesCallback] = hass.data.setdefault(DATA_SERVICE_STATUS, {})
+    if not reporters:
+        async_add_entities([ServiceStatus(circuit_breaker)])
+    reporters[config_entry.entry_id] = async_add_entities
+
+    @callback
+    def _async_move_service_status() -> None:
+        reporting = next(iter(reporters)) == config_entry.entry_id
+        del reporters[config_entry.entry_id]
+        if reporting and reporters:
+            _LOGGER.debug("Moving service status sensor from %s", config_entry.title)
+            next(iter(reporters.values()))([ServiceStatus(circuit_breaker)])
+
+    config_entry.async_on_unload(_async_move_service_status)
 
 
 class OilLevel(SENSiTEntity, SensorEntity):
@@ -54,6 +115,7 @@ class OilLevel(SENSiTEntity, SensorEntity):
     _attr_icon: str | None = "mdi:gauge"
     _attr_name: str | None = "Oil Level"
     _attr_translation_key = "oil_level"
+    _data_fields = ("level", "capacity")
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.VOLUME_STORAGE
     _attr_state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement: str | None = UnitOfVolume.LITERS
@@ -61,16 +123,15 @@ class OilLevel(SENSiTEntity, SensorEntity):
     @property
     def native_value(self):
         """Return the oil level in litres"""
-        _LOGGER.debug("Read oil level: %d litres", self.coordinator.data[self.idx].level)
-        return self.coordinator.data[self.idx].level
+        _LOGGER.debug("Read oil level: %d litres", self.tank_data.level)
+        return self.tank_data.level
 
-    @cached_property
+    @property
     def icon(self):
         """Icon to use in the frontend"""
-        return tank_icon(
-            self.coordinator.data[self.idx].level,
-            self.coordinator.data[self.idx].capacity,
-        )
+        if self.serial_number not in self.coordinator.data:
+            return super().icon
+        return self.tank_metrics.icon
 
 
 class TankPercentageFull(SENSiTEntity, SensorEntity):
@@ -78,25 +139,23 @@ class TankPercentageFull(SENSiTEntity, SensorEntity):
 
     _attr_name: str | None = "Tank Percentage Full"
     _attr_translation_key = "tank_percentage_full"
+    _data_fields = ("level", "capacity")
     _attr_native_unit_of_measurement: str | None = PERCENTAGE
     _attr_state_class: SensorStateClass | None = SensorStateClass.TOTAL
 
     @property
     def native_value(self):
         """Return the oil level as a percentage"""
-        percent_full = 100 * (
-            self.coordinator.data[self.idx].level / self.coordinator.data[self.idx].capacity
-        )
-        _LOGGER.debug("Read oil level: %.1f percent", percent_full)
-        return Decimal(f"{percent_full:.1f}")
+        percent_full = self.tank_metrics.percent_full
+        _LOGGER.debug("Read oil level: %s percent", percent_full)
+        return percent_full
 
-    @cached_property
+    @property
     def icon(self):
         """Icon to use in the frontend"""
-        return tank_icon(
-            self.coordinator.data[self.idx].level,
-            self.coordinator.data[self.idx].capacity,
-        )
+        if self.serial_number not in self.coordinator.data:
+            return super().icon
+        return self.tank_metrics.icon
 
 
 class TankCapacity(SENSiTEntity, SensorEntity):
@@ -105,6 +164,7 @@ class TankCapacity(SENSiTEntity, SensorEntity):
     _attr_icon: str | None = "mdi:gauge-full"
     _attr_name: str | None = "Tank Capacity"
     _attr_translation_key = "tank_capacity"
+    _data_fields = ("capacity",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.VOLUME
     _attr_native_unit_of_measurement: str | None = UnitOfVolume.LITERS
@@ -115,9 +175,9 @@ class TankCapacity(SENSiTEntity, SensorEntity):
         """Return the tank capacity in litres"""
         _LOGGER.debug(
             "Read tank capacity: %d litres",
-            self.coordinator.data[self.idx].capacity,
+            self.tank_data.capacity,
         )
-        return self.coordinator.data[self.idx].capacity
+        return self.tank_data.capacity
 
 
 class LastReadDate(SENSiTEntity, SensorEntity):
@@ -126,14 +186,15 @@ class LastReadDate(SENSiTEntity, SensorEntity):
     _attr_icon: str | None = "mdi:clock-outline"
     _attr_name: str | None = "Last Reading Date"
     _attr_translation_key = "last_reading_date"
+    _data_fields = ("last_read",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.TIMESTAMP
 
     @property
     def native_value(self):
         """Return date of the last reading"""
-        _LOGGER.debug("Tank last read %s", str(self.coordinator.data[self.idx].last_read))
-        return self.coordinator.data[self.idx].last_read
+        _LOGGER.debug("Tank last read %s", str(self.tank_data.last_read))
+        return self.tank_data.last_read
 
 
 class CurrentUsage(SENSiTEntity, SensorEntity):
@@ -142,6 +203,7 @@ class CurrentUsage(SENSiTEntity, SensorEntity):
     _attr_icon: str | None = "mdi:gauge-full"
     _attr_name: str | None = "Current Usage"
     _attr_translation_key = "current_usage"
+    _data_fields = ("analytics",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.VOLUME
     _attr_native_unit_of_measurement: str | None = UnitOfVolume.LITERS
@@ -150,9 +212,9 @@ class CurrentUsage(SENSiTEntity, SensorEntity):
     @property
     def native_value(self):
         """Return the usage in the last day in litres"""
-        current_usage = self.coordinator.data[self.idx].usage_rate
-        _LOGGER.debug("Current oil usage %d litres/day", current_usage)
-        return Decimal(f"{current_usage:.1f}")
+        current_usage = self.tank_metrics.usage_rate
+        _LOGGER.debug("Current oil usage %s litres/day", current_usage)
+        return current_usage
 
 
 class ForecastEmpty(SENSiTEntity, SensorEntity):
@@ -161,6 +223,7 @@ class ForecastEmpty(SENSiTEntity, SensorEntity):
     _attr_icon: str | None = "mdi:calendar"
     _attr_name: str | None = "Forecast Empty"
     _attr_translation_key = "forecast_empty"
+    _data_fields = ("analytics",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_native_unit_of_measurement: str | None = UnitOfTime.DAYS
     _attr_state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
@@ -168,40 +231,54 @@ class ForecastEmpty(SENSiTEntity, SensorEntity):
     @property
     def native_value(self):
         """Return the number of days to empty"""
-        empty_days = self.coordinator.data[self.idx].forecast_empty
+        empty_days = self.tank_data.analytics.forecast_empty
         _LOGGER.debug("Tank forecast empty %d days", empty_days)
         return empty_days
 
 
+class WindowUsage(SENSiTEntity, SensorEntity):
+    """Sensor that reports the average usage over a fixed number of days."""
+
+    _attr_icon: str | None = "mdi:chart-line"
+    _attr_translation_key = "window_usage"
+    _data_fields = ("analytics",)
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.VOLUME
+    _attr_native_unit_of_measurement: str | None = UnitOfVolume.LITERS
+    _attr_state_class: SensorStateClass | None = SensorStateClass.TOTAL
+
+    def __init__(self, coordinator, config_entry, serial_number, days: int):
+        self.days = days
+        self._attr_name = f"Usage {days} Days"
+        self._attr_translation_placeholders = {"days": str(days)}
+        super().__init__(coordinator, config_entry, serial_number)
+
+    @property
+    def native_value(self):
+        """Return the average usage per day over the window in litres"""
+        usage = self.tank_metrics.window_usage.get(self.days)
+        _LOGGER.debug("Oil usage over %d days %s litres/day", self.days, usage)
+        return usage
+
+
 class CurrentEnergyUsage(SENSiTEntity, SensorEntity):
     """Oil consumption in kWh from litres/day sensor."""
 
     _attr_icon: str | None = "mdi:fire"
     _attr_name: str | None = "Current Energy Usage"
     _attr_translation_key = "current_energy_usage"
+    _data_fields = ("analytics",)
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_entity_registry_enabled_default = False
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.ENERGY
     _attr_native_unit_of_measurement: str | None = UnitOfEnergy.KILO_WATT_HOUR
     _attr_state_class: SensorStateClass | None = SensorStateClass.TOTAL
 
-    def __init__(self, coordinator, config_entry, idx):
-        super().__init__(coordinator, config_entry, idx)
-        self._config_entry = config_entry
-
     @property
     def native_value(self) -> float | None:
         """Return energy usage in kWh from litres/day data."""
-        litres_per_day = self.coordinator.data[self.idx].usage_rate
-        energy_density = self._config_entry.options.get(
-            CONF_OIL_ENERGY_DENSITY,
-            self._config_entry.data.get(
-                CONF_OIL_ENERGY_DENSITY,
-                DEFAULT_OIL_ENERGY_DENSITY,
-            ),
-        )
-        kwh_per_day = float(litres_per_day * energy_density)
-        return round(kwh_per_day, 1)
+        return self.tank_metrics.energy_usage
 
 
 class OilConsumption(SENSiTEntity, SensorEntity, RestoreEntity):
@@ -210,15 +287,15 @@ class OilConsumption(SENSiTEntity, SensorEntity, RestoreEntity):
     _attr_icon: str | None = "mdi:fire"
     _attr_name: str | None = "Oil Consumption"
     _attr_translation_key = "oil_consumption"
+    _data_fields = ("last_read", "analytics")
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_entity_registry_enabled_default = False
     _attr_native_unit_of_measurement: str | None = UnitOfEnergy.KILO_WATT_HOUR
     _attr_state_class: SensorStateClass | None = SensorStateClass.TOTAL_INCREASING
     _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.ENERGY
 
-    def __init__(self, coordinator, config_entry, idx):
-        super().__init__(coordinator, config_entry, idx)
-        self._config_entry = config_entry
+    def __init__(self, coordinator, config_entry, serial_number):
+        super().__init__(coordinator, config_entry, serial_number)
         self._state = None
         self._consumption_total = None
         self._consumption_last_read = None
@@ -250,20 +327,13 @@ class OilConsumption(SENSiTEntity, SensorEntity, RestoreEntity):
     @property
     def native_value(self):
         """Return the cumulative energy consumption value."""
-        last_read = self.coordinator.data[self.idx].last_read
+        last_read = self.tank_data.last_read
         if self._consumption_last_read is None:
             self._consumption_last_read = last_read
 
         if self._consumption_last_read != last_read:
-            usage_rate = self.coordinator.data[self.idx].usage_rate
-            energy_density = self._config_entry.options.get(
-                CONF_OIL_ENERGY_DENSITY,
-                self._config_entry.data.get(
-                    CONF_OIL_ENERGY_DENSITY,
-                    DEFAULT_OIL_ENERGY_DENSITY,
-                ),
-            )
-            self._consumption_total += energy_density * round(usage_rate, 1)
+            metrics = self.tank_metrics
+            self._consumption_total += metrics.energy_density * float(metrics.usage_rate)
             self._consumption_last_read = last_read
 
         if self._consumption_total is None:
@@ -272,13 +342,54 @@ class OilConsumption(SENSiTEntity, SensorEntity, RestoreEntity):
         return Decimal(f"{self._consumption_total:.1f}")
 
 
-def tank_icon(level: float, capacity: float) -> str:
-    """Return an icon name that reflects how full the tank is."""
-    percent_full = level / capacity if capacity else 0.0
-    if percent_full >= 0.75:
-        return "mdi:gauge-full"
-    if percent_full >= 0.5:
-        return "mdi:gauge"
-    if percent_full >= 0.25:
-        return "mdi:gauge-low"
-    return "mdi:gauge-empty"
+class ServiceStatus(SensorEntity):
+    """Sensor that reports whether requests are being made to the Kingspan service.
+
+    The state is shared by all entries and tanks, so the sensor has no device.
+    """
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_icon: str | None = "mdi:cloud-check-outline"
+    _attr_name: str | None = "Kingspan Service"
+    _attr_translation_key = "service_status"
+    _attr_unique_id = "sensit-kingspan_service"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class: SensorDeviceClass | None = SensorDeviceClass.ENUM
+    _attr_options: list[str] | None = [state.value for state in CircuitState]
+
+    def __init__(self, circuit_breaker: CircuitBreaker) -> None:
+        self.circuit_breaker = circuit_breaker
+
+    async def async_added_to_hass(self) -> None:
+        """Update the state whenever the circuit breaker changes state."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.circuit_breaker.add_listener(self._handle_breaker_update))
+
+    @callback
+    def _handle_breaker_update(self) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> str:
+        """Return the state of the circuit breaker"""
+        return self.circuit_breaker.state.value
+
+    @property
+    def icon(self) -> str:
+        """Icon to use in the frontend"""
+        return SERVICE_STATUS_ICONS[self.circuit_breaker.state]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the state attributes."""
+        breaker = self.circuit_breaker
+        retry_in = breaker.retry_in
+        return {
+            "attribution": ATTRIBUTION,
+            "integration": DOMAIN,
+            "consecutive_failures": breaker.statistics.consecutive_failures,
+            "next_attempt": (
+                dt_util.utcnow() + timedelta(seconds=retry_in) if retry_in is not None else None
+            ),
+        }
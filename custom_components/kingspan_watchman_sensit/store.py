@@ -0,0 +1,147 @@
+"""Persistent storage for Kingspan Watchman SENSiT."""
+
+import logging
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util.dt import parse_datetime
+
+from .api import TankData
+from .const import DOMAIN, STORAGE_MINOR_VERSION, STORAGE_SAVE_DELAY, STORAGE_VERSION
+from .history import TankHistory, TankHistoryPoint
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def _history_columns(tank_history: TankHistory) -> dict[str, list[float]]:
+    """Return the stored form of a tank's history."""
+    return {
+        "timestamps": tank_history.timestamps.tolist(),
+        "levels": tank_history.levels.tolist(),
+    }
+
+
+class _MigratingStore(Store[dict[str, Any]]):
+    """Store that converts data saved by earlier versions of the integration."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Migrate to the current version."""
+        _LOGGER.debug(
+            "Migrating stored data from version %d.%d", old_major_version, old_minor_version
+        )
+        if old_major_version == 1:
+            # Version 1 saved the history of each tank as [reading date, level] pairs
+            old_data["history"] = {
+                serial_number: _history_columns(
+                    TankHistory.from_points(
+                        TankHistoryPoint(
+                            reading_date=datetime.fromisoformat(reading_date),
+                            level_litres=level_litres,
+                        )
+                        for reading_date, level_litres in points
+                    )
+                )
+                if isinstance(points, list)
+                else points
+                for serial_number, points in old_data.get("history", {}).items()
+            }
+        # Later minor versions only add sections, which are optional when loading
+        return old_data
+
+
+class SENSiTStore:
+    """Tank history and the last known tank data for a config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store[dict[str, Any]] = _MigratingStore(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{entry_id}",
+            private=True,
+            minor_version=STORAGE_MINOR_VERSION,
+        )
+        self._data: dict[str, Any] | None = None
+
+    async def _async_load(self) -> dict[str, Any]:
+        """Load the stored data once and cache it for later reads."""
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+        return self._data
+
+    async def async_load_history(self) -> dict[str, TankHistory]:
+        """Load the stored history for all tanks."""
+        data = await self._async_load()
+        history: dict[str, TankHistory] = {}
+        for serial_number, columns in data.get("history", {}).items():
+            history[serial_number] = TankHistory(columns["timestamps"], columns["levels"])
+            _LOGGER.debug(
+                "Loaded %d history points for tank %s", len(history[serial_number]), serial_number
+            )
+        return history
+
+    async def async_load_tanks(self) -> list[TankData]:
+        """Load the tank data saved after the last successful refresh, without history."""
+        data = await self._async_load()
+        tanks = [
+            TankData(
+                level=tank["level"],
+                serial_number=tank["serial_number"],
+                model=tank["model"],
+                name=tank["name"],
+                capacity=tank["capacity"],
+                last_read=parse_datetime(tank["last_read"]) if tank["last_read"] else None,
+            )
+            for tank in data.get("tanks", [])
+        ]
+        _LOGGER.debug("Loaded last known data for %d tanks", len(tanks))
+        return tanks
+
+    async def async_load_accounts(self) -> list[list[str] | None]:
+        """Load the serial numbers of the tanks reported by each account of a fleet.
+
+        None is loaded for an account whose tanks were not known when the data was saved.
+        """
+        data = await self._async_load()
+        return data.get("accounts", [])
+
+    @callback
+    def async_save(
+        self,
+        history: dict[str, TankHistory],
+        tanks: list[TankData],
+        accounts: list[list[str] | None] | None = None,
+    ) -> None:
+        """Schedule the history and latest data for all tanks to be saved."""
+
+        def _data_to_save() -> dict[str, Any]:
+            self._data = {
+                "history": {
+                    serial_number: _history_columns(tank_history)
+                    for serial_number, tank_history in history.items()
+                },
+                "tanks": [
+                    {
+                        "level": tank.level,
+                        "serial_number": tank.serial_number,
+                        "model": tank.model,
+                        "name": tank.name,
+                        "capacity": tank.capacity,
+                        "last_read": tank.last_read.isoformat() if tank.last_read else None,
+                    }
+                    for tank in tanks
+                ],
+            }
+            if accounts is not None:
+                self._data["accounts"] = accounts
+            return self._data
+
+        self._store.async_delay_save(_data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the stored data."""
+        self._data = None
+        await self._store.async_remove()
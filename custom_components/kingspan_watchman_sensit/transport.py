@@ -0,0 +1,94 @@
+"""HTTP connections shared by all Kingspan Watchman SENSiT config entries."""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util.ssl import client_context
+
+from .const import API_TIMEOUT, DATA_HTTP_CLIENT
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass(slots=True)
+class SharedHttpClient:
+    """A pooled HTTP client and the number of config entries using it."""
+
+    client: httpx.AsyncClient
+    pool_size: int
+    idle_timeout: float
+    users: int = 0
+
+
+def _create_http_client(pool_size: int, idle_timeout: float) -> httpx.AsyncClient:
+    """Create an HTTP client with a pool of connections of the given size."""
+    _LOGGER.debug(
+        "Creating HTTP connection pool of %d connections, idle timeout %.0f seconds",
+        pool_size,
+        idle_timeout,
+    )
+    return httpx.AsyncClient(
+        # The SSL context is loaded once by Home Assistant so this does not block
+        verify=client_context(),
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=idle_timeout,
+        ),
+        # Accounts share the connections so cookies from one must not reach another
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+
+
+@callback
+def async_acquire_http_client(
+    hass: HomeAssistant, pool_size: int, idle_timeout: float
+) -> httpx.AsyncClient:
+    """Return the pooled HTTP client, creating it if no entry is using it yet."""
+    shared: SharedHttpClient | None = hass.data.get(DATA_HTTP_CLIENT)
+    if shared is None:
+        client = _create_http_client(pool_size, idle_timeout)
+        shared = hass.data[DATA_HTTP_CLIENT] = SharedHttpClient(client, pool_size, idle_timeout)
+    shared.users += 1
+    return shared.client
+
+
+@callback
+def async_resize_http_client(
+    hass: HomeAssistant, pool_size: int, idle_timeout: float
+) -> httpx.AsyncClient | None:
+    """Replace the pooled HTTP client if its settings have changed, returning the new client.
+
+    The old client is closed once requests already made with it have timed out.
+    """
+    shared: SharedHttpClient | None = hass.data.get(DATA_HTTP_CLIENT)
+    if shared is None or (shared.pool_size, shared.idle_timeout) == (pool_size, idle_timeout):
+        return None
+    old_client = shared.client
+    shared.client = _create_http_client(pool_size, idle_timeout)
+    shared.pool_size = pool_size
+    shared.idle_timeout = idle_timeout
+
+    async def _async_close_old_client(_now: datetime) -> None:
+        await old_client.aclose()
+
+    async_call_later(hass, API_TIMEOUT, _async_close_old_client)
+    return shared.client
+
+
+async def async_release_http_client(hass: HomeAssistant) -> None:
+    """Stop an entry using the pooled HTTP client, closing it when no entries use it."""
+    shared: SharedHttpClient | None = hass.data.get(DATA_HTTP_CLIENT)
+    if shared is None:
+        return
+    shared.users -= 1
+    if shared.users > 0:
+        return
+    _LOGGER.debug("Closing HTTP connection pool")
+    del hass.data[DATA_HTTP_CLIENT]
+    await shared.client.aclose()
@@ -0,0 +1,51 @@
+#! /usr/bin/env uv run python3
+"""Compare the pure Python and NumPy analytics over 5 years of daily readings."""
+
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.kingspan_watchman_sensit.analytics import (  # noqa: E402
+    AnalyticsBackend,
+    analyse_history,
+)
+from custom_components.kingspan_watchman_sensit.history import TankHistory  # noqa: E402
+
+DAYS = 5 * 365
+REPEATS = 50
+
+
+def synthetic_history() -> TankHistory:
+    """Daily readings that fall by 10 litres a day with a refill every 100 days."""
+    start_date = datetime.now().replace(hour=0, minute=30, second=0, microsecond=0)
+    start_date -= timedelta(days=DAYS)
+    return TankHistory.from_points(
+        {
+            "reading_date": start_date + timedelta(days=day),
+            "level_litres": 2000.0 - 10 * (day % 100),
+        }
+        for day in range(1, DAYS + 1)
+    )
+
+
+def main() -> None:
+    history = synthetic_history()
+    print(f"{DAYS} daily readings, {REPEATS} repeats")
+    for usage_window in (14, 365, DAYS):
+        for backend in AnalyticsBackend:
+            elapsed = min(
+                timeit.repeat(
+                    lambda: analyse_history(history, usage_window, backend),  # noqa: B023
+                    number=REPEATS,
+                    repeat=5,
+                )
+            )
+            name = f"{backend} ({usage_window} days)"
+            print(f"{name:>24}: {elapsed / REPEATS * 1e6:10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#! /usr/bin/env uv run python3
+"""Compare a linear scan and a binary search for the usage window in 5 years of readings."""
+
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.kingspan_watchman_sensit.api import SENSiTApiClient, TankData  # noqa: E402
+from custom_components.kingspan_watchman_sensit.history import (  # noqa: E402
+    TankHistory,
+    filter_history,
+    window_start,
+)
+
+DAYS = 5 * 365
+USAGE_WINDOW = 14
+REPEATS = 200
+
+
+def synthetic_history() -> list[dict]:
+    """Daily readings that fall by 10 litres a day with a refill every 100 days."""
+    start_date = datetime.now().replace(hour=0, minute=30, second=0, microsecond=0)
+    start_date -= timedelta(days=DAYS)
+    return [
+        {
+            "reading_date": start_date + timedelta(days=day),
+            "level_litres": 2000.0 - 10 * (day % 100),
+        }
+        for day in range(1, DAYS + 1)
+    ]
+
+
+def filter_history_linear(history: TankHistory, usage_window: int) -> TankHistory:
+    """Filter implementation from before the window was found by binary search."""
+    cutoff = window_start(usage_window)
+    start = len(history)
+    for idx, timestamp in enumerate(history.timestamps):
+        if timestamp >= cutoff:
+            start = idx
+            break
+    return history[start:]
+
+
+def main() -> None:
+    points = synthetic_history()
+    history = TankHistory.from_points(points)
+    api = SENSiTApiClient("benchmark", "benchmark", USAGE_WINDOW)
+    tank_data = TankData(history=history)
+
+    assert filter_history_linear(history, USAGE_WINDOW) == filter_history(history, USAGE_WINDOW)
+
+    timings = {
+        "filter (linear scan)": lambda: filter_history_linear(history, USAGE_WINDOW),
+        "filter (binary search)": lambda: filter_history(history, USAGE_WINDOW),
+        "usage rate": lambda: api.usage_rate(tank_data),
+    }
+    print(f"{DAYS} daily readings, {USAGE_WINDOW} day window, {REPEATS} repeats")
+    for name, func in timings.items():
+        elapsed = min(timeit.repeat(func, number=REPEATS, repeat=5)) / REPEATS
+        print(f"{name:>24}: {elapsed * 1e6:10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #! /bin/bash
 REMOTE_HOST="hass"
 INTEGRATION_SRC_DIR="custom_components/kingspan_watchman_sensit"
-INTEGRATION_SRC_FILES="__init__.py api.py config_flow.py coordinator.py const.py entity.py manifest.json sensor.py"
+INTEGRATION_SRC_FILES="__init__.py accounts.py analytics.py api.py config_flow.py coordinator.py const.py entity.py history.py manifest.json metrics.py resilience.py scheduler.py sensor.py store.py transport.py"
 REMOTE_INTEGRATION_DIR="/config/custom_components/kingspan_watchman_sensit"
 API_SRC_DIR="../kingspan-connect-sensor/src/connectsensor"
 API_SRC_FILES="__init__.py client.py debug.py exceptions.py tank.py const.py"
@@ -178,9 +178,13 @@ class MockAsyncTank:
         self._level = tank_level
         self._history_type = history_type
         self._tank_num = tank_num
+        self._signalman_no = f"{MOCK_TANK_SERIAL_NUMBER}-{tank_num}"
+        self._level_data = None
 
     @async_property
     async def level(self) -> int:
+        # Mirror the API library, which caches the latest level response
+        self._level_data = {"levelLitres": self._level}
         return self._level
 
     @async_property
@@ -213,14 +217,20 @@ class MockAsyncTank:
         else:
             return datetime.now()
 
-    async def history(self) -> list[dict]:
+    async def history(self, start_date=None, end_date=None) -> list[dict]:
         # Build a month of history with a refill halfway through
         if self._history_type == HistoryType.DECREASING:
-            return decreasing_history(datetime.now())
+            history = decreasing_history(datetime.now())
         elif self._history_type == HistoryType.EXPIRED:
-            return decreasing_history(datetime.now() - timedelta(days=365))
+            history = decreasing_history(datetime.now() - timedelta(days=365))
         else:
-            return []
+            history = []
+        return [
+            point
+            for point in history
+            if (start_date is None or point["reading_date"] >= start_date)
+            and (end_date is None or point["reading_date"] <= end_date)
+        ]
 
 
 class MockAsyncClient(AsyncMock):
@@ -240,13 +250,17 @@ class MockAsyncClient(AsyncMock):
             self._num_tanks = kwargs["num_tanks"]
         else:
             self._num_tanks = 1
+        self._tanks = None
 
     @async_property
     async def tanks(self):
+        # The same tanks are returned for the lifetime of a login
+        if self._tanks is not None:
+            return self._tanks
         if self._num_tanks == 1:
-            return [MockAsyncTank(tank_level=self._level, history_type=self._history_type)]
+            self._tanks = [MockAsyncTank(tank_level=self._level, history_type=self._history_type)]
         else:
-            return [
+            self._tanks = [
                 MockAsyncTank(
                     tank_level=self._level,
                     history_type=self._history_type,
@@ -254,6 +268,7 @@ class MockAsyncClient(AsyncMock):
                 )
                 for tank_num in range(1, self._num_tanks + 1)
             ]
+        return self._tanks
 
 
 @pytest_asyncio.fixture(params=["tank_level", "history_type", "num_tanks"])
@@ -283,7 +298,9 @@ def mock_sensor_client(request):
         mock_client.return_value.__aenter__.return_value = MockAsyncClient(
             tank_level=tank_level, history_type=history_type, num_tanks=num_tanks
         )
-        ha_mock_client.return_value.__aenter__.return_value = MockAsyncClient(
+        # Clients using pooled connections are not entered as a context manager
+        ha_mock_client.return_value = MockAsyncClient(
             tank_level=tank_level, history_type=history_type, num_tanks=num_tanks
         )
+        ha_mock_client.return_value.__aenter__.return_value = ha_mock_client.return_value
         yield
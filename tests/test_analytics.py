@@ -0,0 +1,92 @@
+"""Tests for Kingspan Watchman SENSiT usage analytics."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from custom_components.kingspan_watchman_sensit.analytics import (
+    AnalyticsBackend,
+    TankAnalytics,
+    UsageIndex,
+    analyse_history,
+)
+from custom_components.kingspan_watchman_sensit.const import USAGE_PERCENTILES, USAGE_WINDOWS
+from custom_components.kingspan_watchman_sensit.history import TankHistory
+
+from .conftest import decreasing_history
+
+
+def random_history() -> list[dict]:
+    """A year of readings at random times of day with occasional refills."""
+    rng = random.Random(42)
+    start_date = datetime.now() - timedelta(days=365)
+    level = 2000.0
+    points = []
+    for day in range(365):
+        level = 2000.0 if level < 300 else level - rng.uniform(0, 30)
+        reading_date = start_date + timedelta(days=day, minutes=rng.randrange(24 * 60))
+        points.append({"reading_date": reading_date, "level_litres": level})
+    return points
+
+
+HISTORIES = {
+    "decreasing": decreasing_history(datetime.now()),
+    "expired": decreasing_history(datetime.now() - timedelta(days=365)),
+    "single": [{"reading_date": datetime.now(), "level_litres": 1000}],
+    "empty-tank": [
+        {"reading_date": datetime.now() - timedelta(days=day), "level_litres": 0}
+        for day in range(10)
+    ],
+    "random": random_history(),
+}
+
+
+def test_analytics_decreasing():
+    """Usage and forecast match a known history."""
+    history = TankHistory.from_points(HISTORIES["decreasing"])
+    analytics = analyse_history(history, 14, AnalyticsBackend.PYTHON)
+
+    assert round(analytics.usage_rate, 2) == 96.67
+    assert analytics.forecast_empty == 10
+    assert analytics.refill_count == 1
+    assert list(analytics.usage_percentiles) == list(USAGE_PERCENTILES)
+    assert len(analytics.rolling_usage) > 0
+    assert sum(analytics.weekday_usage.values()) > 0
+    assert analyse_history(TankHistory(), 14) == TankAnalytics()
+
+
+@pytest.mark.parametrize("name", HISTORIES.keys())
+def test_analytics_backends(name):
+    """NumPy and pure Python analytics give the same results."""
+    pytest.importorskip("numpy")
+    history = TankHistory.from_points(HISTORIES[name])
+
+    expected = analyse_history(history, 365, AnalyticsBackend.PYTHON)
+    analytics = analyse_history(history, 365, AnalyticsBackend.NUMPY)
+
+    assert analytics.usage_rate == pytest.approx(expected.usage_rate)
+    assert analytics.forecast_empty == expected.forecast_empty
+    assert analytics.refill_count == expected.refill_count
+    assert analytics.window_start == expected.window_start
+    assert analytics.window_end == expected.window_end
+    assert analytics.usage_percentiles == pytest.approx(expected.usage_percentiles)
+    assert analytics.rolling_usage == pytest.approx(expected.rolling_usage)
+    assert analytics.weekday_usage == pytest.approx(expected.weekday_usage)
+
+
+def test_usage_index():
+    """Usage over each window from the index matches analysing the window itself."""
+    points = HISTORIES["random"]
+    history = TankHistory.from_points(points[:200])
+    usage_index = UsageIndex()
+    usage_index.update(history)
+    # Readings added since the last update are indexed incrementally
+    history.extend(points[200:])
+    analytics = analyse_history(history, 21, AnalyticsBackend.PYTHON, usage_index=usage_index)
+
+    assert list(analytics.window_usage) == sorted({*USAGE_WINDOWS, 21})
+    for days, usage_rate in analytics.window_usage.items():
+        expected = analyse_history(history, days, AnalyticsBackend.PYTHON)
+        assert usage_rate == pytest.approx(expected.usage_rate)
+    assert analytics.window_usage[21] == pytest.approx(analytics.usage_rate)
+    assert UsageIndex().usage_rate(7) == 0.0
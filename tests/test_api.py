@@ -3,16 +3,16 @@
 import asyncio
 from datetime import datetime
 from typing import get_type_hints
+from unittest.mock import AsyncMock
 
 import pandas as pd
 import pytest
-from connectsensor import KingspanAPIError
-from custom_components.kingspan_watchman_sensit.api import (
-    SENSiTApiClient,
-    TankData,
-    TankHistoryPoint,
-    filter_history,
-)
+from connectsensor import KingspanAPIError, KingspanInvalidCredentialsError
+from custom_components.kingspan_watchman_sensit.analytics import TankAnalytics, analyse_history
+from custom_components.kingspan_watchman_sensit.api import SENSiTApiClient, TankData
+from custom_components.kingspan_watchman_sensit.const import CIRCUIT_FAILURE_THRESHOLD
+from custom_components.kingspan_watchman_sensit.history import TankHistory, filter_history
+from custom_components.kingspan_watchman_sensit.resilience import CircuitState, RateLimiter
 from homeassistant.util.dt import as_local, set_default_time_zone
 from httpx import TimeoutException as httpxTimeoutException
 from tzlocal import get_localzone
@@ -24,6 +24,7 @@ from .const import (
     MOCK_TANK_MODEL,
     MOCK_TANK_NAME,
     MOCK_TANK_SERIAL_NUMBER,
+    HistoryType,
 )
 
 
@@ -42,6 +43,8 @@ async def test_api(mock_sensor_client, mocker, caplog):
     assert tank_data[0].last_read == as_local(history.iloc[-1].reading_date)
     assert round(tank_data[0].usage_rate, 2) == 96.67
     assert tank_data[0].forecast_empty == 10
+    assert tank_data[0].analytics.refill_count == 1
+    assert tank_data[0].analytics.window_end == tank_data[0].last_read
 
     mocker.patch(MOCK_GET_DATA_METHOD, side_effect=asyncio.TimeoutError)
     with pytest.raises(KingspanAPIError) as e:
@@ -57,7 +60,8 @@ async def test_api_timeout(mocker, caplog):
     api = SENSiTApiClient("test", "test", 14)
     caplog.clear()
 
-    assert not await api.check_credentials()
+    with pytest.raises(TimeoutError):
+        await api.check_credentials()
     assert "Timeout error logging in" in caplog.text
 
 
@@ -69,10 +73,23 @@ async def test_api_error(mocker, caplog):
     api = SENSiTApiClient("test", "test", 14)
     caplog.clear()
 
-    assert not await api.check_credentials()
+    with pytest.raises(KingspanAPIError):
+        await api.check_credentials()
     assert "API error logging in" in caplog.text
 
 
+async def test_api_invalid_credentials(mocker):
+    """Invalid credentials should be told apart from other login failures."""
+    mocker.patch(
+        "connectsensor.client.AsyncSensorClient.login",
+        side_effect=KingspanInvalidCredentialsError("Authentication Failed"),
+    )
+    api = SENSiTApiClient("test", "test", 14)
+
+    with pytest.raises(KingspanInvalidCredentialsError):
+        await api.check_credentials()
+
+
 async def test_api_generic_error(mocker, caplog):
     """Test API calls."""
     set_default_time_zone(get_localzone())
@@ -81,7 +98,8 @@ async def test_api_generic_error(mocker, caplog):
     api = SENSiTApiClient("test", "test", 14)
     caplog.clear()
 
-    assert not await api.check_credentials()
+    with pytest.raises(KingspanAPIError):
+        await api.check_credentials()
     assert "Unhandled error logging in" in caplog.text
 
 
@@ -96,13 +114,27 @@ async def test_api_filtering(mock_sensor_client):
     assert int(tank_data[0].usage_rate) == 100.0
 
 
+@pytest.mark.parametrize(
+    "mock_sensor_client", [[MOCK_TANK_LEVEL, HistoryType.DECREASING, 3]], indirect=True
+)
+@pytest.mark.parametrize("concurrency", [1, 3])
+async def test_api_concurrent_tanks(mock_sensor_client, concurrency):
+    """Tanks fetched concurrently should be returned in the order of the account."""
+    api = SENSiTApiClient("test", "test", concurrency=concurrency)
+    tank_data = await api.async_get_data()
+    assert [tank.serial_number for tank in tank_data] == [
+        f"{MOCK_TANK_SERIAL_NUMBER}-{tank_num}" for tank_num in range(1, 4)
+    ]
+    assert all(round(tank.usage_rate, 2) == 96.67 for tank in tank_data)
+
+
 def test_api_type_annotations():
     """Assert the strict typing contract remains explicit and stable."""
     tank_annotations = get_type_hints(TankData)
-    assert tank_annotations["history"] == list[TankHistoryPoint] | None
+    assert tank_annotations["history"] == TankHistory | None
 
     filter_annotations = get_type_hints(filter_history)
-    assert filter_annotations["history"] == list[TankHistoryPoint] | None
+    assert filter_annotations["history"] == TankHistory | None
     assert filter_annotations["usage_window"] == int
 
     method_annotations = get_type_hints(SENSiTApiClient.usage_rate)
@@ -116,18 +148,205 @@ def test_api_no_history_zero_usage():
     """Exercise the no-history and zero-usage edge cases for coverage."""
     api = SENSiTApiClient("test", "test")
 
-    assert filter_history(None, 14) == []
+    assert len(filter_history(None, 14)) == 0
 
     tank_data = TankData(
-        history=[
-            {
-                "reading_date": datetime.now(),
-                "level_litres": 100.0,
-            }
-        ]
+        history=TankHistory.from_points(
+            [
+                {
+                    "reading_date": datetime.now(),
+                    "level_litres": 100.0,
+                }
+            ]
+        )
     )
     assert api.usage_rate(tank_data) == 0.0
     assert api.forecast_empty(tank_data) == 0
+    assert analyse_history(None, 14) == TankAnalytics()
+
+
+async def test_api_session_reused(mock_sensor_client):
+    """A long-lived session should only log in once across refreshes."""
+    api = SENSiTApiClient("test", "test")
+    _ = await api.async_get_data()
+    _ = await api.async_get_data()
+    assert api.statistics.logins_performed == 1
+    assert api.statistics.logins_saved == 1
+
+    await api.async_close()
+    _ = await api.async_get_data()
+    assert api.statistics.logins_performed == 2
+
+
+async def test_api_check_credentials_session(mock_sensor_client):
+    """Checking credentials should log in once and leave the session for the first fetch."""
+    api = SENSiTApiClient("test", "test")
+    assert await api.check_credentials()
+    _ = await api.async_get_data()
+    assert api.statistics.logins_performed == 1
+    assert api.statistics.logins_saved == 1
+
+
+async def test_api_joins_refresh(mock_sensor_client, caplog):
+    """Concurrent requests for tank data should share a single fetch."""
+    api = SENSiTApiClient("test", "test")
+    caplog.clear()
+    results = await asyncio.gather(api.async_get_data(), api.async_get_data())
+
+    assert results[0] is results[1]
+    assert api.statistics.refreshes_joined == 1
+    assert len([log for log in caplog.record_tuples if "Fetching tank data" in log[2]]) == 1
+
+
+async def test_api_joins_login(mock_sensor_client):
+    """Concurrent credential checks and fetches should share a single login."""
+    api = SENSiTApiClient("test", "test")
+    results = await asyncio.gather(
+        api.check_credentials(), api.check_credentials(), api.async_get_data()
+    )
+
+    assert results[0] and results[1]
+    assert api.statistics.credential_checks_joined == 1
+    assert api.statistics.logins_joined == 1
+    assert api.statistics.logins_performed == 1
+
+
+async def test_api_incremental_history(mock_sensor_client):
+    """History should only be requested again when the tank has a new reading."""
+    api = SENSiTApiClient("test", "test")
+    tank_data = await api.async_get_data()
+    assert len(tank_data[0].history) == 30
+    assert api.statistics.history_points_fetched == 30
+
+    first_analytics = tank_data[0].analytics
+
+    tank_data = await api.async_get_data()
+    assert len(tank_data[0].history) == 30
+    assert api.statistics.history_points_fetched == 30
+    assert api.history[MOCK_TANK_SERIAL_NUMBER] == tank_data[0].history
+
+    # The last reading has not changed so history is not requested again
+    assert api.statistics.history_requests_made == 1
+    assert api.statistics.history_requests_skipped == 1
+    assert tank_data[0].analytics is first_analytics
+
+
+async def test_api_level_ttl(mock_sensor_client):
+    """Levels fetched within the level TTL should be reused rather than requested."""
+    api = SENSiTApiClient("test", "test")
+    _ = await api.async_get_data()
+    _ = await api.async_get_data()
+    assert api.statistics.level_requests_made == 2
+
+    api.level_ttl = 3600
+    tank_data = await api.async_get_data()
+    assert tank_data[0].level == MOCK_TANK_LEVEL
+    assert tank_data[0].name == MOCK_TANK_NAME
+    assert api.statistics.level_requests_made == 2
+    assert api.statistics.level_requests_skipped == 1
+
+
+async def test_api_session_expired(mock_sensor_client, mocker):
+    """An authentication error should log in again and retry once."""
+    api = SENSiTApiClient("test", "test")
+    tank_data = await api.async_get_data()
+
+    mocker.patch.object(
+        api,
+        "_fetch_tank_data",
+        AsyncMock(
+            side_effect=[KingspanInvalidCredentialsError("Authentication Failed"), tank_data]
+        ),
+    )
+    assert await api.async_get_data() == tank_data
+    assert api.statistics.logins_performed == 2
+
+
+async def test_api_circuit_breaker(mock_sensor_client, mocker):
+    """Requests should stop after consecutive failures until a probe succeeds."""
+    api = SENSiTApiClient("test", "test")
+    tank_data = await api.async_get_data()
+
+    get_data = mocker.patch(MOCK_GET_DATA_METHOD, side_effect=asyncio.TimeoutError)
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(KingspanAPIError, match="Timeout error"):
+            _ = await api.async_get_data()
+    assert api.circuit_breaker.state == CircuitState.OPEN
+
+    with pytest.raises(KingspanAPIError, match="Kingspan service unavailable"):
+        _ = await api.async_get_data()
+    assert get_data.call_count == CIRCUIT_FAILURE_THRESHOLD
+    assert api.circuit_breaker.statistics.requests_rejected == 1
+
+    # Probe once the backoff has passed
+    mocker.patch.object(api.circuit_breaker, "_retry_at", 0.0)
+    get_data.side_effect = None
+    get_data.return_value = tank_data
+    assert await api.async_get_data() == tank_data
+    assert api.circuit_breaker.state == CircuitState.CLOSED
+
+
+async def test_api_circuit_breaker_credentials(mocker):
+    """Credential checks should not log in while the circuit is open."""
+    login = mocker.patch(
+        "connectsensor.client.AsyncSensorClient.login", side_effect=asyncio.TimeoutError
+    )
+    api = SENSiTApiClient("test", "test")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(TimeoutError):
+            await api.check_credentials()
+    assert api.circuit_breaker.state == CircuitState.OPEN
+
+    with pytest.raises(KingspanAPIError, match="Kingspan service unavailable"):
+        await api.check_credentials()
+    assert login.call_count == CIRCUIT_FAILURE_THRESHOLD
+
+
+async def test_api_circuit_breaker_service_errors(mock_sensor_client, mocker):
+    """Errors reported by the Kingspan service should not open the circuit."""
+    api = SENSiTApiClient("test", "test")
+    mocker.patch(MOCK_GET_DATA_METHOD, side_effect=KingspanAPIError("No level data"))
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD + 1):
+        with pytest.raises(KingspanAPIError, match="No level data"):
+            _ = await api.async_get_data()
+    assert api.circuit_breaker.state == CircuitState.CLOSED
+    assert api.circuit_breaker.statistics.consecutive_failures == 0
+
+
+async def test_api_rate_limiter(mock_sensor_client):
+    """Every request to the Kingspan service should be rate limited."""
+    api = SENSiTApiClient("test", "test")
+    _ = await api.async_get_data()
+    # Login, level and history
+    assert api.rate_limiter.statistics.requests == 3
+
+    # Neither the session nor history are requested again
+    _ = await api.async_get_data()
+    assert api.rate_limiter.statistics.requests == 4
+
+
+async def test_api_rate_limiter_wait(mock_sensor_client, mocker):
+    """Waiting for the rate limiter should not count towards the request timeout."""
+    mocker.patch("custom_components.kingspan_watchman_sensit.api.API_TIMEOUT", 0.05)
+    api = SENSiTApiClient("test", "test")
+    api.rate_limiter = RateLimiter(rate=2.0)
+    _ = await api.async_get_data()
+    assert api.rate_limiter.statistics.requests_delayed == 1
+    assert api.rate_limiter.statistics.total_wait > 0.05
+    assert api.circuit_breaker.statistics.consecutive_failures == 0
+
+
+async def test_api_http_client(mock_sensor_client):
+    """Sessions should use the pooled HTTP client without closing it."""
+    http_client = AsyncMock()
+    api = SENSiTApiClient("test", "test")
+    api.http_client = http_client
+    _ = await api.async_get_data()
+    assert api._session._client is http_client
+
+    await api.async_close()
+    assert api._session is None
+    http_client.aclose.assert_not_called()
 
 
 @pytest.mark.asyncio
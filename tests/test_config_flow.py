@@ -3,14 +3,27 @@
 from logging import WARNING
 from unittest.mock import patch
 
+import pytest
 import pytest_asyncio
 from custom_components.kingspan_watchman_sensit import async_setup_entry
 from custom_components.kingspan_watchman_sensit.config_flow import SENSiTFlowHandler
 from custom_components.kingspan_watchman_sensit.const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CONF_ACCOUNTS,
+    CONF_ADD_ANOTHER,
+    CONF_FLEET,
+    CONF_HTTP_IDLE_TIMEOUT,
+    CONF_HTTP_POOL_SIZE,
     CONF_PASSWORD,
+    CONF_RATE_LIMIT,
+    DATA_VALIDATED_CLIENTS,
+    DEFAULT_HTTP_IDLE_TIMEOUT,
+    DEFAULT_HTTP_POOL_SIZE,
     DEFAULT_OIL_ENERGY_DENSITY,
+    DEFAULT_RATE_LIMIT,
     DOMAIN,
 )
+from custom_components.kingspan_watchman_sensit.resilience import async_get_circuit_breaker
 from homeassistant import config_entries, data_entry_flow
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
@@ -58,6 +71,39 @@ async def test_successful_config_flow(hass, bypass_get_data):
     assert result["data"] == MOCK_CONFIG
     assert result["result"]
 
+    # The validated session is left for the new entry's setup
+    assert MOCK_CONFIG[CONF_USERNAME].casefold() in hass.data[DATA_VALIDATED_CLIENTS]
+
+
+async def test_fleet_config_flow(hass, bypass_get_data):
+    """A fleet entry should collect credentials for several accounts."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={**MOCK_CONFIG, CONF_FLEET: True}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "fleet_account"
+
+    for username, add_another in (("second@example.com", True), ("third@example.com", False)):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            user_input={
+                CONF_USERNAME: username,
+                CONF_PASSWORD: "password",
+                CONF_ADD_ANOTHER: add_another,
+            },
+        )
+
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert result["title"] == "test@example.com (+2)"
+    assert result["data"][CONF_USERNAME] == MOCK_CONFIG[CONF_USERNAME]
+    assert [account[CONF_USERNAME] for account in result["data"][CONF_ACCOUNTS]] == [
+        "second@example.com",
+        "third@example.com",
+    ]
+
 
 def test_flow_matching_is_never_true():
     """The flow helper should report no match for unrelated flows."""
@@ -67,7 +113,7 @@ def test_flow_matching_is_never_true():
     assert not flow.is_matching(SENSiTFlowHandler())
 
 
-async def test_failed_config_flow(hass, error_on_get_data):
+async def test_failed_config_flow(hass, error_sensor_client):
     """Test a failed config flow due to credential validation failure."""
 
     result = await hass.config_entries.flow.async_init(
@@ -85,6 +131,25 @@ async def test_failed_config_flow(hass, error_on_get_data):
     assert result["errors"] == {"base": "auth"}
 
 
+async def test_config_flow_circuit_open(hass, mock_sensor_client):
+    """A config flow should not log in while the shared circuit breaker is open."""
+    breaker = async_get_circuit_breaker(hass)
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=MOCK_CONFIG
+    )
+
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {"base": "cannot_connect"}
+    assert breaker.statistics.requests_rejected == 1
+    assert not hass.data.get(DATA_VALIDATED_CLIENTS)
+
+
 async def test_duplicate_config_flow_aborts(hass, bypass_get_data):
     """A second config flow for the same username should abort as already configured."""
     existing_entry = MockConfigEntry(
@@ -129,8 +194,13 @@ async def test_options_default_flow(hass, caplog):
     assert result["title"] == "Mock Title"
 
     assert config_entry.options == {
+        "adaptive_polling": False,
+        "api_concurrency": 4,
         "debug_kingspan": False,
+        "http_idle_timeout": DEFAULT_HTTP_IDLE_TIMEOUT,
+        "http_pool_size": DEFAULT_HTTP_POOL_SIZE,
         "oil_energy_density": DEFAULT_OIL_ENERGY_DENSITY,
+        "rate_limit": DEFAULT_RATE_LIMIT,
         "update_interval": 8,
         "usage_window": 14,
     }
@@ -152,8 +222,13 @@ async def test_options_flow(hass, bypass_get_data):
     assert await async_setup_entry(hass, config_entry)
 
     assert config_entry.options == {
+        "adaptive_polling": False,
+        "api_concurrency": 4,
         "debug_kingspan": True,
+        "http_idle_timeout": DEFAULT_HTTP_IDLE_TIMEOUT,
+        "http_pool_size": DEFAULT_HTTP_POOL_SIZE,
         "oil_energy_density": DEFAULT_OIL_ENERGY_DENSITY,
+        "rate_limit": DEFAULT_RATE_LIMIT,
         "update_interval": 4,
         "usage_window": 28,
     }
@@ -177,6 +252,47 @@ async def test_options_flow(hass, bypass_get_data):
     }
 
 
+@pytest.mark.parametrize(
+    ("option", "value"), [(CONF_RATE_LIMIT, 0), (CONF_RATE_LIMIT, -1.0), (CONF_HTTP_POOL_SIZE, 0)]
+)
+async def test_options_flow_invalid_limits(hass, bypass_get_data, option, value):
+    """Limits which would never allow a request should be rejected."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+
+    with pytest.raises(data_entry_flow.InvalidData):
+        await hass.config_entries.options.async_configure(
+            result["flow_id"], user_input={option: value}
+        )
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={CONF_RATE_LIMIT: "0.5"}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert config_entry.options[CONF_RATE_LIMIT] == 0.5
+
+
+async def test_options_flow_settings_entry(hass, bypass_get_data):
+    """Options for all entries should only be offered by the oldest entry."""
+    config_entries = [
+        MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id=entry_id)
+        for entry_id in ("test1", "test2")
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+
+    schemas = [
+        (await hass.config_entries.options.async_init(config_entry.entry_id))["data_schema"]
+        for config_entry in config_entries
+    ]
+    for option in (CONF_RATE_LIMIT, CONF_HTTP_POOL_SIZE, CONF_HTTP_IDLE_TIMEOUT):
+        assert option in schemas[0].schema
+        assert option not in schemas[1].schema
+
+
 async def test_reconfigure_credentials_invalid(hass):
     """Reconfigure should stay on the form when credential validation fails."""
     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
@@ -190,8 +306,8 @@ async def test_reconfigure_credentials_invalid(hass):
     assert result["step_id"] == "reconfigure"
 
     with patch(
-        "custom_components.kingspan_watchman_sensit.config_flow.SENSiTApiClient.async_get_data",
-        side_effect=Exception,
+        "custom_components.kingspan_watchman_sensit.config_flow.SENSiTApiClient.check_credentials",
+        return_value=False,
     ):
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -0,0 +1,62 @@
+"""Tests for Kingspan Watchman SENSiT tank history."""
+
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from custom_components.kingspan_watchman_sensit.history import TankHistory, filter_history
+from homeassistant.util.dt import as_local
+
+from .conftest import decreasing_history
+
+
+def test_history_from_points():
+    """Readings are sorted, de-duplicated and read back as local datetimes."""
+    points = decreasing_history(datetime.now())
+    history = TankHistory.from_points(reversed(points))
+
+    assert len(history) == len(points)
+    assert history[0]["reading_date"] == as_local(points[0]["reading_date"])
+    assert history[-1]["level_litres"] == points[-1]["level_litres"]
+    assert history.last_reading_date == as_local(points[-1]["reading_date"])
+    assert history.as_list() == list(history)
+
+    assert history.extend(points) == 0
+    new_point = {"reading_date": datetime.now() + timedelta(days=1), "level_litres": 10}
+    assert history.extend([new_point]) == 1
+    assert len(history) == len(points) + 1
+
+    assert TankHistory().last_reading_date is None
+    with pytest.raises(ValueError):
+        TankHistory([1.0], [])
+
+
+def test_history_filter():
+    """Filtering returns only the most recent readings."""
+    history = TankHistory.from_points(decreasing_history(datetime.now()))
+    window = filter_history(history, 5)
+
+    assert isinstance(window, TankHistory)
+    assert len(window) >= 5
+    assert window == history[-len(window) :]
+
+    expired_history = TankHistory.from_points(
+        decreasing_history(datetime.now() - timedelta(days=365))
+    )
+    assert len(filter_history(expired_history, 14)) == 0
+
+
+def test_history_memory():
+    """Columnar history should be an order of magnitude smaller than a list of dicts."""
+    start_date = datetime.now() - timedelta(days=5 * 365)
+    points = [
+        {"reading_date": start_date + timedelta(days=day), "level_litres": 1000.0 - day}
+        for day in range(5 * 365)
+    ]
+    history = TankHistory.from_points(points)
+
+    dict_size = sys.getsizeof(points) + sum(
+        sys.getsizeof(point) + sys.getsizeof(point["reading_date"]) for point in points
+    )
+    array_size = sys.getsizeof(history.timestamps) + sys.getsizeof(history.levels)
+    assert array_size * 10 < dict_size
@@ -1,23 +1,73 @@
 """Test Kingspan Watchman SENSiT setup process."""
 
 import logging
+from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch
 
 import pytest
-from connectsensor.exceptions import KingspanAPIError
+from connectsensor.exceptions import (
+    KingspanAPIError,
+    KingspanInvalidCredentialsError,
+    KingspanTimeoutError,
+)
 from custom_components.kingspan_watchman_sensit import (
+    SENSiTApiClient,
     SENSiTDataUpdateCoordinator,
+    _async_refresh_stored_data,
     async_get_config_entry_diagnostics,
     async_reload_entry,
     async_setup_entry,
     async_unload_entry,
 )
-from custom_components.kingspan_watchman_sensit.const import DOMAIN
+from custom_components.kingspan_watchman_sensit.accounts import (
+    async_add_validated_client,
+    async_pop_validated_client,
+)
+from custom_components.kingspan_watchman_sensit.api import TankData
+from custom_components.kingspan_watchman_sensit.const import (
+    API_TIMEOUT,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CONF_ACCOUNTS,
+    CONF_API_CONCURRENCY,
+    CONF_HTTP_POOL_SIZE,
+    CONF_OIL_ENERGY_DENSITY,
+    CONF_PASSWORD,
+    CONF_RATE_LIMIT,
+    CONF_UPDATE_INTERVAL,
+    CONF_USAGE_WINDOW,
+    CONF_USERNAME,
+    DATA_ACCOUNTS,
+    DATA_HTTP_CLIENT,
+    DATA_VALIDATED_CLIENTS,
+    DEFAULT_API_CONCURRENCY,
+    DEFAULT_UPDATE_INTERVAL,
+    DOMAIN,
+    LEVEL_TTL_FACTOR,
+    STARTUP_REFRESH_SPREAD,
+    STORAGE_MINOR_VERSION,
+    STORAGE_VERSION,
+    VALIDATED_CLIENT_TTL,
+)
+from custom_components.kingspan_watchman_sensit.coordinator import SENSiTFleetCoordinator
+from custom_components.kingspan_watchman_sensit.resilience import (
+    async_get_circuit_breaker,
+    async_get_rate_limiter,
+)
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers import issue_registry as ir
-from pytest_homeassistant_custom_component.common import MockConfigEntry
-
-from .const import MOCK_CONFIG, MOCK_TANK_LEVEL, HistoryType
+from homeassistant.util.dt import as_local, utcnow
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+
+from .const import (
+    MOCK_CONFIG,
+    MOCK_TANK_CAPACITY,
+    MOCK_TANK_LEVEL,
+    MOCK_TANK_MODEL,
+    MOCK_TANK_NAME,
+    MOCK_TANK_SERIAL_NUMBER,
+    HistoryType,
+)
 
 
 async def test_refresh_data(hass, mock_sensor_client, caplog):
@@ -62,6 +112,52 @@ async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
     assert config_entry.entry_id not in hass.data[DOMAIN]
 
 
+async def test_options_applied_in_place(hass, mock_sensor_client):
+    """Options which do not need a new connection should be applied without a reload."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    tank = coordinator.data[MOCK_TANK_SERIAL_NUMBER]
+    logins = coordinator.api.statistics.logins_performed
+    options = {CONF_UPDATE_INTERVAL: 4, CONF_USAGE_WINDOW: 7, CONF_OIL_ENERGY_DENSITY: 10.0}
+    hass.config_entries.async_update_entry(config_entry, options=options)
+    await hass.async_block_till_done()
+
+    assert config_entry.runtime_data is coordinator
+    assert coordinator.api.statistics.logins_performed == logins
+    assert coordinator.api.level_ttl == 4 * 3600 * LEVEL_TTL_FACTOR
+    assert coordinator.api.usage_window == 7
+    assert coordinator.data[MOCK_TANK_SERIAL_NUMBER] is not tank
+    assert coordinator.data[MOCK_TANK_SERIAL_NUMBER].history is tank.history
+    assert coordinator.metrics[MOCK_TANK_SERIAL_NUMBER].energy_density == 10.0
+
+    # A new connection pool is used at once and the old one closed once its requests finish
+    http_client = coordinator.api.http_client
+    hass.config_entries.async_update_entry(
+        config_entry, options={**options, CONF_HTTP_POOL_SIZE: 2}
+    )
+    await hass.async_block_till_done()
+    assert config_entry.runtime_data is coordinator
+    assert coordinator.api.http_client is hass.data[DATA_HTTP_CLIENT].client
+    assert coordinator.api.http_client is not http_client
+    assert not http_client.is_closed
+    async_fire_time_changed(hass, utcnow() + timedelta(seconds=API_TIMEOUT + 1))
+    await hass.async_block_till_done()
+    assert http_client.is_closed
+
+    # Credentials can only be changed by reloading the entry
+    hass.config_entries.async_update_entry(
+        config_entry, data={**MOCK_CONFIG, CONF_PASSWORD: "new password"}
+    )
+    await hass.async_block_till_done()
+    assert config_entry.runtime_data is not coordinator
+
+    assert await async_unload_entry(hass, config_entry)
+
+
 async def test_setup_entry_exception(hass, error_on_get_data):
     """Test ConfigEntryNotReady when API raises an exception during entry setup."""
     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
@@ -121,6 +217,20 @@ async def test_auth_timeout(hass, timeout_sensor_client):
     assert e.value.translation_key == "timed_out"
 
 
+async def test_auth_circuit_open(hass, mock_sensor_client):
+    """Setup should be retried rather than reauthenticated while the service is unavailable."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    breaker = async_get_circuit_breaker(hass)
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    with pytest.raises(ConfigEntryNotReady) as e:
+        assert await async_setup_entry(hass, config_entry)
+    assert e.value.translation_key == "service_unavailable"
+    issue_registry = ir.async_get(hass)
+    assert not issue_registry.async_get_issue(DOMAIN, f"credentials_{config_entry.entry_id}")
+
+
 async def test_auth_no_tank_data(hass, error_no_tank_data, caplog):
     """Test entry setup and unload."""
 
@@ -191,7 +301,7 @@ async def test_coordinator_logs_available_again(hass, mock_sensor_client, mocker
     mocker.patch.object(
         coordinator.api,
         "async_get_data",
-        AsyncMock(return_value=coordinator.data),
+        AsyncMock(return_value=list(coordinator.data.values())),
     )
     await coordinator.update()
 
@@ -221,3 +331,524 @@ async def test_diagnostics(hass, mock_sensor_client):
     assert diagnostics["last_update_success"]
     assert diagnostics["tanks"][0]["serial_number"] == "20001234-1"
     assert diagnostics["tanks"][0]["level"] == 1000
+    assert round(diagnostics["tanks"][0]["analytics"]["usage_rate"], 2) == 96.67
+    assert diagnostics["tanks"][0]["analytics"]["forecast_empty"] == 10
+    assert diagnostics["tanks"][0]["analytics"]["refill_count"] == 1
+    # Setup validates credentials and fetches the first data with a single login
+    assert diagnostics["api_statistics"]["logins_performed"] == 1
+    assert diagnostics["api_statistics"]["logins_saved"] == 2
+    assert diagnostics["circuit_breaker"]["state"] == "closed"
+    # Login, level and history requests for each tank
+    assert diagnostics["rate_limiter"]["requests"] == 5
+    assert diagnostics["rate_limiter"]["queue_depth"] == 0
+
+
+async def test_setup_uses_validated_session(hass, mock_sensor_client):
+    """Setup should continue with the session validated by the config flow."""
+    client = SENSiTApiClient(MOCK_CONFIG[CONF_USERNAME], MOCK_CONFIG[CONF_PASSWORD])
+    assert await client.check_credentials()
+    async_add_validated_client(hass, MOCK_CONFIG[CONF_USERNAME], client)
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    statistics = config_entry.runtime_data.api.statistics
+    assert statistics.logins_performed == 1
+    assert statistics.logins_saved == 2
+    assert not hass.data[DATA_VALIDATED_CLIENTS]
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_validated_session_other_password(hass, mock_sensor_client):
+    """A session validated with different credentials should not be used."""
+    client = SENSiTApiClient(MOCK_CONFIG[CONF_USERNAME], "old-password")
+    async_add_validated_client(hass, MOCK_CONFIG[CONF_USERNAME].upper(), client)
+
+    assert (
+        await async_pop_validated_client(
+            hass, MOCK_CONFIG[CONF_USERNAME], MOCK_CONFIG[CONF_PASSWORD]
+        )
+        is None
+    )
+    assert not hass.data[DATA_VALIDATED_CLIENTS]
+
+
+async def test_validated_session_expires(hass, mock_sensor_client):
+    """A session validated by a flow that setup never claims should be closed."""
+    client = SENSiTApiClient(MOCK_CONFIG[CONF_USERNAME], MOCK_CONFIG[CONF_PASSWORD])
+    with patch.object(client, "async_close", AsyncMock()) as mock_close:
+        async_add_validated_client(hass, MOCK_CONFIG[CONF_USERNAME], client)
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=VALIDATED_CLIENT_TTL - 1))
+        await hass.async_block_till_done()
+        mock_close.assert_not_awaited()
+
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=VALIDATED_CLIENT_TTL + 1))
+        await hass.async_block_till_done()
+        mock_close.assert_awaited_once()
+    assert not hass.data[DATA_VALIDATED_CLIENTS]
+    assert (
+        await async_pop_validated_client(
+            hass, MOCK_CONFIG[CONF_USERNAME], MOCK_CONFIG[CONF_PASSWORD]
+        )
+        is None
+    )
+
+
+async def test_setup_failure_releases_pool(hass, mock_sensor_client):
+    """A setup that fails before polling should release the pool and the account."""
+    client = SENSiTApiClient(MOCK_CONFIG[CONF_USERNAME], MOCK_CONFIG[CONF_PASSWORD])
+    async_add_validated_client(hass, MOCK_CONFIG[CONF_USERNAME], client)
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    with patch.object(SENSiTApiClient, "async_adopt_session", AsyncMock(side_effect=RuntimeError)):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert DATA_HTTP_CLIENT not in hass.data
+    assert not hass.data[DATA_ACCOUNTS]
+
+
+async def test_shared_account(hass, mock_sensor_client, caplog):
+    """Entries for the same account should share a client and its refreshes."""
+    config_entries = [
+        MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id=entry_id)
+        for entry_id in ("test1", "test2")
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinators = [config_entry.runtime_data for config_entry in config_entries]
+    assert coordinators[0].api is coordinators[1].api
+    assert coordinators[0].peers == coordinators
+
+    caplog.clear()
+    coordinators[0].data[MOCK_TANK_SERIAL_NUMBER].level = 0
+    await coordinators[1].async_refresh()
+    update_logs = [log[2] for log in caplog.record_tuples if "Fetching tank data" in log[2]]
+    assert len(update_logs) == 1
+    assert coordinators[0].data[MOCK_TANK_SERIAL_NUMBER].level == MOCK_TANK_LEVEL
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entries[0])
+    assert diagnostics["shared_entries"] == 2
+
+    assert await async_unload_entry(hass, config_entries[0])
+    assert coordinators[1].peers == [coordinators[1]]
+    assert hass.data[DATA_ACCOUNTS]
+
+    assert await async_unload_entry(hass, config_entries[1])
+    assert not hass.data[DATA_ACCOUNTS]
+
+
+async def test_shared_account_options(hass, mock_sensor_client):
+    """Entries sharing an account should keep their own usage window and request limits."""
+    entry_options = {
+        "test1": {CONF_USAGE_WINDOW: 7},
+        "test2": {CONF_USAGE_WINDOW: 30, CONF_UPDATE_INTERVAL: 2, CONF_API_CONCURRENCY: 1},
+    }
+    config_entries = [
+        MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, options=options, entry_id=entry_id)
+        for entry_id, options in entry_options.items()
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinators = [config_entry.runtime_data for config_entry in config_entries]
+    client = coordinators[0].api
+    assert client is coordinators[1].api
+    assert client.level_ttl == 2 * 3600 * LEVEL_TTL_FACTOR
+    assert client.concurrency == 1
+
+    await coordinators[0].async_refresh()
+    tanks = [coordinator.data[MOCK_TANK_SERIAL_NUMBER] for coordinator in coordinators]
+    assert tanks[0].analytics == client.analyse(tanks[0], 7)
+    assert tanks[1].analytics == client.analyse(tanks[1], 30)
+    assert tanks[0].analytics.window_start != tanks[1].analytics.window_start
+
+    # Changing the usage window of one entry leaves the other unchanged
+    hass.config_entries.async_update_entry(config_entries[0], options={CONF_USAGE_WINDOW: 14})
+    await hass.async_block_till_done()
+    assert coordinators[0].data[MOCK_TANK_SERIAL_NUMBER].analytics == client.analyse(tanks[0], 14)
+    assert coordinators[1].data[MOCK_TANK_SERIAL_NUMBER].analytics == tanks[1].analytics
+
+    assert await async_unload_entry(hass, config_entries[1])
+    assert client.level_ttl == DEFAULT_UPDATE_INTERVAL * 3600 * LEVEL_TTL_FACTOR
+    assert client.concurrency == DEFAULT_API_CONCURRENCY
+    assert await async_unload_entry(hass, config_entries[0])
+
+
+async def test_rate_limit_set_by_oldest_entry(hass, mock_sensor_client):
+    """The rate limit for all entries should only be set by the oldest entry."""
+    config_entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            data={**MOCK_CONFIG, CONF_USERNAME: f"{entry_id}@example.com"},
+            options={CONF_RATE_LIMIT: rate_limit},
+            entry_id=entry_id,
+        )
+        for entry_id, rate_limit in (("test1", 2.0), ("test2", 8.0))
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    rate_limiter = async_get_rate_limiter(hass)
+    assert rate_limiter.rate == 2.0
+
+    hass.config_entries.async_update_entry(config_entries[1], options={CONF_RATE_LIMIT: 9.0})
+    await hass.async_block_till_done()
+    assert rate_limiter.rate == 2.0
+
+    hass.config_entries.async_update_entry(config_entries[0], options={CONF_RATE_LIMIT: 3.0})
+    await hass.async_block_till_done()
+    assert rate_limiter.rate == 3.0
+
+    for config_entry in config_entries:
+        assert await async_unload_entry(hass, config_entry)
+
+
+async def test_shared_http_client(hass, mock_sensor_client):
+    """All entries should use one pool of connections, closed with the last entry."""
+    config_entries = [
+        MockConfigEntry(
+            domain=DOMAIN, data={**MOCK_CONFIG, CONF_USERNAME: username}, entry_id=username
+        )
+        for username in ("first@example.com", "second@example.com")
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    clients = [config_entry.runtime_data.api for config_entry in config_entries]
+    assert clients[0] is not clients[1]
+    http_client = hass.data[DATA_HTTP_CLIENT].client
+    assert clients[0].http_client is http_client
+    assert clients[1].http_client is http_client
+    assert hass.data[DATA_HTTP_CLIENT].users == 2
+
+    assert await async_unload_entry(hass, config_entries[0])
+    assert not http_client.is_closed
+
+    assert await async_unload_entry(hass, config_entries[1])
+    assert http_client.is_closed
+    assert DATA_HTTP_CLIENT not in hass.data
+
+
+async def test_fleet(hass, mock_sensor_client):
+    """A fleet entry should poll every account and report each account's status."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            **MOCK_CONFIG,
+            CONF_ACCOUNTS: [{CONF_USERNAME: "second@example.com", CONF_PASSWORD: "password"}],
+        },
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    assert isinstance(coordinator, SENSiTFleetCoordinator)
+    assert len(coordinator.clients) == 2
+    # Both accounts report the same tank, which only appears once
+    assert len(coordinator.data) == 1
+    assert [status.tank_count for status in coordinator.account_status] == [1, 1]
+    assert all(status.success for status in coordinator.account_status)
+
+    # Tanks for an account which fails keep their last known data
+    coordinator.clients[1].async_get_data = AsyncMock(side_effect=KingspanAPIError("down"))
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert len(coordinator.data) == 1
+    assert coordinator.account_status[1].success is False
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["config_entry_data"][CONF_ACCOUNTS][0][CONF_USERNAME] == "**REDACTED**"
+    assert [account["success"] for account in diagnostics["fleet_accounts"]] == [True, False]
+    assert diagnostics["fleet_accounts"][0]["latency"] is not None
+
+    coordinator.clients[0].async_get_data = AsyncMock(side_effect=KingspanAPIError("down"))
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_fleet_keeps_devices_of_failed_account(hass, hass_storage, mock_sensor_client):
+    """Devices of an account which fails to update should not be removed after a warm start."""
+    storage_key = f"{DOMAIN}.test"
+    second_serial_number = "20000002"
+    stored_tanks = [
+        {
+            "level": 1500.0,
+            "serial_number": serial_number,
+            "model": MOCK_TANK_MODEL,
+            "name": MOCK_TANK_NAME,
+            "capacity": MOCK_TANK_CAPACITY,
+            "last_read": None,
+        }
+        for serial_number in (MOCK_TANK_SERIAL_NUMBER, second_serial_number)
+    ]
+    hass_storage[storage_key] = {
+        "version": STORAGE_VERSION,
+        "minor_version": STORAGE_MINOR_VERSION,
+        "key": storage_key,
+        "data": {
+            "history": {},
+            "tanks": stored_tanks,
+            "accounts": [[MOCK_TANK_SERIAL_NUMBER], [second_serial_number]],
+        },
+    }
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            **MOCK_CONFIG,
+            CONF_ACCOUNTS: [{CONF_USERNAME: "second@example.com", CONF_PASSWORD: "password"}],
+        },
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    second_account_tanks: list[TankData] = []
+
+    async def get_data(client):
+        if client._username == "second@example.com":
+            if not second_account_tanks:
+                raise KingspanAPIError("down")
+            return second_account_tanks
+        return [TankData(level=MOCK_TANK_LEVEL, serial_number=MOCK_TANK_SERIAL_NUMBER)]
+
+    with patch.object(SENSiTApiClient, "async_get_data", autospec=True, side_effect=get_data):
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=STARTUP_REFRESH_SPREAD))
+        await hass.async_block_till_done()
+
+        coordinator = config_entry.runtime_data
+        assert coordinator.startup.time_to_live_state is not None
+        assert coordinator.account_status[1].success is False
+        assert coordinator.data[second_serial_number].level == 1500.0
+        device_registry = dr.async_get(hass)
+        assert device_registry.async_get_device(identifiers={(DOMAIN, second_serial_number)})
+
+        # The tank is removed once its account reports that it has gone
+        second_account_tanks.append(TankData(serial_number="20000003"))
+        await coordinator.async_refresh()
+        assert second_serial_number not in coordinator.data
+        assert not device_registry.async_get_device(identifiers={(DOMAIN, second_serial_number)})
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_history_store(hass, hass_storage, mock_sensor_client):
+    """Stored history should seed the client so only newer readings are fetched."""
+    storage_key = f"{DOMAIN}.test"
+    old_reading = datetime.now().replace(microsecond=0) - timedelta(days=60)
+    hass_storage[storage_key] = {
+        "version": STORAGE_VERSION,
+        "minor_version": STORAGE_MINOR_VERSION,
+        "key": storage_key,
+        "data": {
+            "history": {
+                MOCK_TANK_SERIAL_NUMBER: {
+                    "timestamps": [as_local(old_reading).timestamp()],
+                    "levels": [1500.0],
+                }
+            }
+        },
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    history = coordinator.data[MOCK_TANK_SERIAL_NUMBER].history
+    assert len(history) == 31
+    assert history[0]["reading_date"] == as_local(old_reading)
+    assert history[0]["level_litres"] == 1500.0
+    assert coordinator.api.statistics.history_points_fetched == 30
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_history_store_migration(hass, hass_storage, mock_sensor_client):
+    """History saved as reading pairs by version 1 should be loaded as columns."""
+    storage_key = f"{DOMAIN}.test"
+    old_reading = datetime.now().replace(microsecond=0) - timedelta(days=60)
+    hass_storage[storage_key] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": storage_key,
+        "data": {"history": {MOCK_TANK_SERIAL_NUMBER: [[old_reading.isoformat(), 1500.0]]}},
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    history = config_entry.runtime_data.data[MOCK_TANK_SERIAL_NUMBER].history
+    assert history[0]["reading_date"] == as_local(old_reading)
+    assert history[0]["level_litres"] == 1500.0
+    assert hass_storage[storage_key]["version"] == STORAGE_VERSION
+    assert hass_storage[storage_key]["minor_version"] == STORAGE_MINOR_VERSION
+    assert hass_storage[storage_key]["data"]["history"][MOCK_TANK_SERIAL_NUMBER]["levels"][0] == (
+        1500.0
+    )
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_warm_start(hass, hass_storage, mock_sensor_client):
+    """Entities should start with stored data and then be refreshed in the background."""
+    storage_key = f"{DOMAIN}.test"
+    last_read = datetime.now().replace(microsecond=0) - timedelta(days=2)
+    hass_storage[storage_key] = {
+        "version": STORAGE_VERSION,
+        "minor_version": STORAGE_MINOR_VERSION,
+        "key": storage_key,
+        "data": {
+            "history": {
+                MOCK_TANK_SERIAL_NUMBER: {
+                    "timestamps": [as_local(last_read).timestamp()],
+                    "levels": [1500.0],
+                }
+            },
+            "tanks": [
+                {
+                    "level": 1500.0,
+                    "serial_number": MOCK_TANK_SERIAL_NUMBER,
+                    "model": MOCK_TANK_MODEL,
+                    "name": MOCK_TANK_NAME,
+                    "capacity": MOCK_TANK_CAPACITY,
+                    "last_read": as_local(last_read).isoformat(),
+                }
+            ],
+        },
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.kingspan_watchman_sensit._async_refresh_stored_data",
+        AsyncMock(),
+    ) as refresh:
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        refresh.assert_not_called()
+
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=STARTUP_REFRESH_SPREAD))
+        await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    refresh.assert_called_once()
+    assert coordinator.data[MOCK_TANK_SERIAL_NUMBER].level == 1500.0
+    assert coordinator.data[MOCK_TANK_SERIAL_NUMBER].last_read == as_local(last_read)
+    assert len(coordinator.data[MOCK_TANK_SERIAL_NUMBER].history) == 1
+    assert coordinator.startup.warm_start
+    assert coordinator.startup.time_to_first_state is not None
+    assert coordinator.startup.time_to_live_state is None
+
+    await coordinator.async_refresh()
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["tanks"][0]["level"] == MOCK_TANK_LEVEL
+    assert diagnostics["startup"]["warm_start"]
+    assert diagnostics["startup"]["time_to_live_state"] is not None
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_warm_start_staggered(hass, hass_storage, mock_sensor_client):
+    """Entries started with stored data should not all refresh at once after a restart."""
+    config_entries = []
+    for entry_id in ("test1", "test2"):
+        storage_key = f"{DOMAIN}.{entry_id}"
+        hass_storage[storage_key] = {
+            "version": STORAGE_VERSION,
+            "minor_version": STORAGE_MINOR_VERSION,
+            "key": storage_key,
+            "data": {
+                "history": {},
+                "tanks": [
+                    {
+                        "level": 1500.0,
+                        "serial_number": MOCK_TANK_SERIAL_NUMBER,
+                        "model": MOCK_TANK_MODEL,
+                        "name": MOCK_TANK_NAME,
+                        "capacity": MOCK_TANK_CAPACITY,
+                        "last_read": None,
+                    }
+                ],
+            },
+        }
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={**MOCK_CONFIG, CONF_USERNAME: f"{entry_id}@example.com"},
+            entry_id=entry_id,
+        )
+        config_entry.add_to_hass(hass)
+        config_entries.append(config_entry)
+
+    with patch(
+        "custom_components.kingspan_watchman_sensit._async_refresh_stored_data",
+        AsyncMock(),
+    ) as refresh:
+        for config_entry in config_entries:
+            await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        delays = [entry.runtime_data.startup.refresh_delay for entry in config_entries]
+        assert all(0 <= delay < STARTUP_REFRESH_SPREAD for delay in delays)
+        assert abs(delays[0] - delays[1]) > 1
+        refresh.assert_not_called()
+
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=min(delays) + 1))
+        await hass.async_block_till_done()
+        assert [call.args[1] for call in refresh.call_args_list] == [
+            config_entries[delays.index(min(delays))]
+        ]
+
+        async_fire_time_changed(hass, utcnow() + timedelta(seconds=max(delays) + 1))
+        await hass.async_block_till_done()
+        assert refresh.call_count == 2
+
+    for config_entry in config_entries:
+        assert await async_unload_entry(hass, config_entry)
+
+
+@pytest.mark.parametrize(
+    ("login_error", "reauth"),
+    [
+        (KingspanInvalidCredentialsError("Authentication Failed"), True),
+        (KingspanTimeoutError("HTTP request timeout"), False),
+        (KingspanAPIError("HTTP request failed: Connection refused"), False),
+    ],
+)
+async def test_warm_start_login_failure(hass, mocker, login_error, reauth):
+    """A failed login after a warm start should still refresh so stored data is not kept."""
+    mocker.patch("connectsensor.client.AsyncSensorClient.login", side_effect=login_error)
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    coordinator = SENSiTDataUpdateCoordinator(
+        hass,
+        client=SENSiTApiClient("user", "password"),
+        config_entry=config_entry,
+        update_interval=timedelta(hours=8),
+    )
+
+    with patch.object(config_entry, "async_start_reauth") as start_reauth:
+        await _async_refresh_stored_data(hass, config_entry, coordinator)
+
+    assert start_reauth.called == reauth
+    assert not coordinator.last_update_success
+    issue_registry = ir.async_get(hass)
+    issue = issue_registry.async_get_issue(DOMAIN, f"credentials_{config_entry.entry_id}")
+    assert (issue is not None) == reauth
+    await coordinator.async_close()
@@ -0,0 +1,150 @@
+"""Tests for Kingspan Watchman SENSiT outage and overload handling."""
+
+import asyncio
+import time
+
+from connectsensor.exceptions import (
+    KingspanAPIError,
+    KingspanInvalidCredentialsError,
+    KingspanTimeoutError,
+)
+from custom_components.kingspan_watchman_sensit.resilience import (
+    CircuitBreaker,
+    CircuitState,
+    RateLimiter,
+    is_outage_error,
+)
+from httpx import ConnectError
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_opens_after_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, base_backoff=60, clock=clock)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.statistics.times_opened == 1
+    assert 30 <= breaker.retry_in <= 60
+    assert not breaker.allow_request()
+    assert breaker.statistics.requests_rejected == 1
+
+    # Failures of requests started before the circuit opened are only counted
+    breaker.record_failure()
+    assert breaker.statistics.backoff == 60
+
+
+def test_circuit_backoff():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=60, max_backoff=200, clock=clock)
+    breaker.record_failure()
+
+    for expected_backoff in (120, 200, 200):
+        clock.now += breaker.retry_in
+        assert breaker.allow_request()
+        assert breaker.state == CircuitState.HALF_OPEN
+        # Only one probe is made at a time
+        assert not breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.statistics.backoff == expected_backoff
+        assert expected_backoff / 2 <= breaker.retry_in <= expected_backoff
+    assert breaker.statistics.times_opened == 1
+
+
+def test_circuit_closes_on_success():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=60, clock=clock)
+    changes = []
+    remove_listener = breaker.add_listener(lambda: changes.append(breaker.state))
+    breaker.record_failure()
+
+    clock.now += 60
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.retry_in is None
+    assert breaker.statistics.consecutive_failures == 0
+    assert changes == [CircuitState.OPEN, CircuitState.HALF_OPEN, CircuitState.CLOSED]
+
+    remove_listener()
+    breaker.record_failure()
+    assert len(changes) == 3
+
+
+def test_circuit_stalled_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=60, clock=clock)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow_request()
+
+    # Another probe is allowed if the first never finishes
+    clock.now += 59
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def test_is_outage_error():
+    assert is_outage_error(TimeoutError())
+    assert is_outage_error(KingspanTimeoutError("HTTP request timeout"))
+    assert is_outage_error(ConnectError("Connection refused"))
+    assert is_outage_error(KingspanAPIError("HTTP request failed: Connection refused"))
+    assert is_outage_error(KingspanAPIError("Malformed response from API"))
+    assert is_outage_error(ValueError())
+    assert not is_outage_error(KingspanInvalidCredentialsError("Authentication Failed"))
+    assert not is_outage_error(KingspanAPIError("No level data"))
+
+
+async def test_rate_limiter_burst():
+    limiter = RateLimiter(rate=20)
+    started = time.monotonic()
+    for _ in range(20):
+        await limiter.acquire()
+    assert time.monotonic() - started < 0.05
+    assert limiter.statistics.requests_delayed == 0
+
+    await limiter.acquire()
+    assert limiter.statistics.requests_delayed == 1
+    assert limiter.statistics.max_wait >= 0.04
+
+
+async def test_rate_limiter_queue():
+    limiter = RateLimiter(rate=100)
+    limiter.rate = 50
+    for _ in range(50):
+        await limiter.acquire()
+
+    finished = []
+
+    async def request(idx: int) -> None:
+        await limiter.acquire()
+        finished.append(idx)
+
+    tasks = [asyncio.create_task(request(idx)) for idx in range(5)]
+    await asyncio.sleep(0)
+    assert limiter.statistics.queue_depth == 5
+    await asyncio.gather(*tasks)
+
+    # Requests are made in the order they were queued
+    assert finished == [0, 1, 2, 3, 4]
+    assert limiter.statistics.queue_depth == 0
+    assert limiter.statistics.max_queue_depth == 5
+    assert limiter.statistics.requests == 55
+    assert limiter.statistics.rate == 50
+    assert limiter.statistics.max_wait >= 0.08
@@ -0,0 +1,128 @@
+"""Tests for Kingspan Watchman SENSiT adaptive polling."""
+
+from datetime import timedelta
+
+from custom_components.kingspan_watchman_sensit.api import TankData
+from custom_components.kingspan_watchman_sensit.const import (
+    ADAPTIVE_MIN_INTERVAL,
+    ADAPTIVE_POLL_MARGIN,
+    ADAPTIVE_RETRY_INTERVAL,
+    LEVEL_TTL_FACTOR,
+    POLL_JITTER,
+)
+from custom_components.kingspan_watchman_sensit.history import TankHistory
+from custom_components.kingspan_watchman_sensit.scheduler import (
+    PollScheduler,
+    poll_offset,
+    reading_cadence,
+    staggered_interval,
+)
+from homeassistant.util.dt import now as dt_now
+
+from .const import MOCK_TANK_SERIAL_NUMBER
+
+UPDATE_INTERVAL = timedelta(hours=8)
+
+
+def daily_tank(last_read_age: timedelta) -> TankData:
+    """A tank which reports once a day, last reporting some time ago."""
+    last_read = dt_now().replace(microsecond=0) - last_read_age
+    history = TankHistory.from_points(
+        {"reading_date": last_read - timedelta(days=day), "level_litres": 1000.0 + day}
+        for day in range(10)
+    )
+    return TankData(
+        level=1000.0,
+        serial_number=MOCK_TANK_SERIAL_NUMBER,
+        last_read=history.last_reading_date,
+        history=history,
+    )
+
+
+def test_reading_cadence():
+    """Cadence is learned from the gaps between recent readings."""
+    assert reading_cadence(daily_tank(timedelta(hours=1))) == timedelta(days=1)
+    assert reading_cadence(TankData()) is None
+
+
+def test_poll_after_expected_reading():
+    """The next poll is shortly after the next reading is expected."""
+    scheduler = PollScheduler(UPDATE_INTERVAL)
+    tank = daily_tank(timedelta(hours=4))
+    interval = scheduler.next_interval([tank], dt_now())
+
+    expected = timedelta(hours=20, minutes=ADAPTIVE_POLL_MARGIN)
+    assert abs(interval - expected) < timedelta(minutes=1)
+    assert scheduler.statistics.cadences == {MOCK_TANK_SERIAL_NUMBER: 86400.0}
+
+
+def test_backoff_when_unchanged():
+    """Polls for an overdue reading back off while results are unchanged."""
+    scheduler = PollScheduler(UPDATE_INTERVAL)
+    tank = daily_tank(timedelta(hours=30))
+
+    intervals = [scheduler.next_interval([tank], dt_now()) for _ in range(8)]
+    assert intervals[0] == timedelta(minutes=ADAPTIVE_RETRY_INTERVAL)
+    assert intervals[1] == timedelta(minutes=2 * ADAPTIVE_RETRY_INTERVAL)
+    assert intervals[-1] == timedelta(days=1)
+    assert scheduler.statistics.unchanged_polls == 7
+
+    new_reading = daily_tank(timedelta(minutes=1))
+    interval = scheduler.next_interval([new_reading], dt_now())
+    assert scheduler.statistics.unchanged_polls == 0
+    assert interval > timedelta(hours=23)
+
+
+def test_no_history_uses_update_interval():
+    """Tanks without enough history are polled at the configured interval."""
+    scheduler = PollScheduler(UPDATE_INTERVAL)
+    assert scheduler.next_interval([TankData()], dt_now()) == UPDATE_INTERVAL
+    assert scheduler.next_interval([], dt_now()) == UPDATE_INTERVAL
+
+    tank = daily_tank(timedelta(days=1, minutes=ADAPTIVE_POLL_MARGIN - 1))
+    assert scheduler.next_interval([tank], dt_now()) >= timedelta(minutes=ADAPTIVE_MIN_INTERVAL)
+
+
+def test_poll_offset():
+    """Offsets are deterministic and spread entries across the interval."""
+    offsets = [poll_offset(f"entry-{idx}", UPDATE_INTERVAL) for idx in range(1000)]
+    assert offsets[0] == poll_offset("entry-0", UPDATE_INTERVAL)
+    assert all(0 <= offset < UPDATE_INTERVAL.total_seconds() for offset in offsets)
+
+    # Each eighth of the interval should have roughly an eighth of the entries
+    buckets = [0] * 8
+    for offset in offsets:
+        buckets[int(offset / UPDATE_INTERVAL.total_seconds() * 8)] += 1
+    assert min(buckets) > 80
+
+
+def test_staggered_interval():
+    """Polls are made in the entry's slot whenever the previous poll was made."""
+    interval_seconds = UPDATE_INTERVAL.total_seconds()
+    offset = poll_offset("entry", UPDATE_INTERVAL)
+    for now in (1_000_000.0, 1_003_600.0, 1_020_000.0):
+        interval, jitter = staggered_interval(offset, UPDATE_INTERVAL, now)
+        assert abs(jitter) <= POLL_JITTER
+        next_poll = now + interval.total_seconds() - jitter
+        phase = (next_poll - offset) % interval_seconds
+        assert min(phase, interval_seconds - phase) < 1e-3
+        assert interval_seconds / 2 - POLL_JITTER <= interval.total_seconds()
+        assert interval.total_seconds() <= 1.5 * interval_seconds + POLL_JITTER
+
+
+def test_staggered_interval_level_ttl():
+    """The next poll is not made while the level fetched by the last poll is reused."""
+    interval_seconds = UPDATE_INTERVAL.total_seconds()
+    level_ttl = interval_seconds * LEVEL_TTL_FACTOR
+    offset = interval_seconds * 0.6
+    # Without the level TTL the next slot is only 0.6 of an interval away
+    interval, _ = staggered_interval(offset, UPDATE_INTERVAL, 0.0)
+    assert interval.total_seconds() < level_ttl
+
+    interval, jitter = staggered_interval(offset, UPDATE_INTERVAL, 0.0, min_wait=level_ttl)
+    assert interval.total_seconds() >= level_ttl
+    assert abs(interval.total_seconds() - jitter - (offset + interval_seconds)) < 1e-3
+
+    # A poll made in its slot leaves the following slot unchanged
+    interval, jitter = staggered_interval(offset, UPDATE_INTERVAL, offset, min_wait=level_ttl)
+    assert abs(interval.total_seconds() - jitter - interval_seconds) < 1e-3
@@ -1,13 +1,22 @@
 """Test Kingspan Watchman SENSiT sensor states."""
 
 import asyncio
+from dataclasses import replace
 from datetime import UTC, datetime, timedelta
 from zoneinfo import ZoneInfo
 
 import pytest
 from connectsensor.exceptions import KingspanAPIError
-from custom_components.kingspan_watchman_sensit import async_unload_entry
-from custom_components.kingspan_watchman_sensit.const import DEFAULT_OIL_ENERGY_DENSITY, DOMAIN
+from custom_components.kingspan_watchman_sensit import (
+    async_get_config_entry_diagnostics,
+    async_remove_config_entry_device,
+    async_unload_entry,
+)
+from custom_components.kingspan_watchman_sensit.const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    DEFAULT_OIL_ENERGY_DENSITY,
+    DOMAIN,
+)
 from homeassistant.const import ATTR_ICON
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers import entity_registry as er
@@ -17,11 +26,13 @@ from homeassistant.util.dt import get_time_zone, set_default_time_zone
 from pytest_homeassistant_custom_component.common import MockConfigEntry, State, mock_restore_cache
 
 from .const import (
+    CONF_USERNAME,
     MOCK_CONFIG,
     MOCK_GET_DATA_METHOD,
     MOCK_TANK_CAPACITY,
     MOCK_TANK_LEVEL,
     MOCK_TANK_NAME,
+    MOCK_TANK_SERIAL_NUMBER,
     HistoryType,
 )
 
@@ -114,7 +125,8 @@ async def test_current_energy_usage(hass, mock_sensor_client):
     state = hass.states.get("sensor.tanky_mctankface_current_energy_usage")
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
     assert state is not None
-    assert state.state == str(round(coordinator.data[0].usage_rate * DEFAULT_OIL_ENERGY_DENSITY, 1))
+    usage_rate = coordinator.data[MOCK_TANK_SERIAL_NUMBER].usage_rate
+    assert state.state == str(round(usage_rate * DEFAULT_OIL_ENERGY_DENSITY, 1))
     assert state.attributes.get(ATTR_ICON) == "mdi:fire"
 
     assert await async_unload_entry(hass, config_entry)
@@ -196,21 +208,69 @@ async def test_sensor_exceptions(hass, mock_sensor_client, mocker, caplog):
         "KingspanAPIError during update: Timeout error fetching data" in caplog.record_tuples[1][2]
     )
 
+    # Later failures are only logged by the API until the entry updates again
     caplog.clear()
     mocker.patch(MOCK_GET_DATA_METHOD, side_effect=KingspanAPIError("api-test error"))
     with pytest.raises(UpdateFailed):
         await hass.data[DOMAIN][config_entry.entry_id].update()
-    assert len(caplog.record_tuples) == 2
+    assert len(caplog.record_tuples) == 1
     assert "API error fetching data for test@example.com" in caplog.record_tuples[0][2]
-    assert "KingspanAPIError during update: API error fetching data" in caplog.record_tuples[1][2]
 
     caplog.clear()
     mocker.patch(MOCK_GET_DATA_METHOD, side_effect=Exception())
     with pytest.raises(UpdateFailed):
         await hass.data[DOMAIN][config_entry.entry_id].update()
-    assert len(caplog.record_tuples) == 2
+    assert len(caplog.record_tuples) == 1
     assert "Unhandled error" in caplog.record_tuples[0][2]
-    assert "KingspanAPIError during update: Unhandled error" in caplog.record_tuples[1][2]
+
+
+async def test_sensor_service_status(hass, mock_sensor_client, mocker):
+    """The service status should follow the circuit breaker and stay available."""
+    config_entries = [
+        MockConfigEntry(
+            domain=DOMAIN, data={**MOCK_CONFIG, CONF_USERNAME: f"{entry_id}@example.com"}
+        )
+        for entry_id in ("test1", "test2")
+    ]
+    for config_entry in config_entries:
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    # The breaker is shared by every entry and tank, so there is a single sensor
+    service_sensors = [
+        entity_id
+        for entity_id in hass.states.async_entity_ids("sensor")
+        if entity_id.startswith("sensor.kingspan_service")
+    ]
+    assert service_sensors == ["sensor.kingspan_service"]
+    config_entry = config_entries[0]
+    state = hass.states.get("sensor.kingspan_service")
+    assert state.state == "closed"
+    assert state.attributes.get(ATTR_ICON) == "mdi:cloud-check-outline"
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    mocker.patch(MOCK_GET_DATA_METHOD, side_effect=asyncio.TimeoutError)
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert not coordinator.last_update_success
+    state = hass.states.get("sensor.kingspan_service")
+    assert state.state == "open"
+    assert state.attributes.get(ATTR_ICON) == "mdi:cloud-off-outline"
+    assert state.attributes["consecutive_failures"] == CIRCUIT_FAILURE_THRESHOLD
+    assert state.attributes["next_attempt"] is not None
+    assert hass.states.get("sensor.tanky_mctankface_oil_level").state == "unavailable"
+
+    # The remaining entry takes over the sensor when the reporting entry is unloaded
+    assert await hass.config_entries.async_unload(config_entries[0].entry_id)
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.kingspan_service").state == "open"
+    entity_entry = er.async_get(hass).async_get("sensor.kingspan_service")
+    assert entity_entry.config_entry_id == config_entries[1].entry_id
+
+    assert await async_unload_entry(hass, config_entries[1])
 
 
 @pytest.mark.parametrize(
@@ -248,6 +308,63 @@ async def test_sensor_icon_full(hass, mock_sensor_client):
     assert await async_unload_entry(hass, config_entry)
 
 
+@pytest.mark.parametrize("mock_sensor_client", [[MOCK_TANK_CAPACITY]], indirect=True)
+async def test_sensor_icon_follows_level(hass, mock_sensor_client):
+    """Icons and derived values should follow each update rather than the first."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG)
+
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    first_metrics = coordinator.metrics
+    assert coordinator.metrics is first_metrics
+    assert hass.states.get("sensor.tanky_mctankface_tank_percentage_full").state == "100.0"
+
+    tank = coordinator.data[MOCK_TANK_SERIAL_NUMBER]
+    coordinator.async_set_updated_data({tank.serial_number: replace(tank, level=100)})
+    await hass.async_block_till_done()
+
+    assert coordinator.metrics is not first_metrics
+    state = hass.states.get("sensor.tanky_mctankface_oil_level")
+    assert state.attributes.get(ATTR_ICON) == "mdi:gauge-empty"
+    state = hass.states.get("sensor.tanky_mctankface_tank_percentage_full")
+    assert state.state == str(100 * (100 / MOCK_TANK_CAPACITY))
+    assert state.attributes.get(ATTR_ICON) == "mdi:gauge-empty"
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_sensor_unchanged_data(hass, mock_sensor_client):
+    """Only entities whose tank data has changed should be updated."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG)
+
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    entity_count = len(list(coordinator.async_contexts()))
+    await coordinator.async_refresh()
+    statistics = coordinator.listener_statistics
+    assert statistics.updates_suppressed == entity_count
+
+    state = hass.states.get("sensor.tanky_mctankface_last_reading_date")
+    tank = coordinator.data[MOCK_TANK_SERIAL_NUMBER]
+    coordinator.async_set_updated_data({tank.serial_number: replace(tank, level=100)})
+    await hass.async_block_till_done()
+    # Oil level and percentage full
+    assert statistics.updates_suppressed == 2 * entity_count - 2
+    assert hass.states.get("sensor.tanky_mctankface_oil_level").state == "100"
+    assert hass.states.get("sensor.tanky_mctankface_last_reading_date") is state
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["entity_updates"]["updates_suppressed"] == 2 * entity_count - 2
+
+    assert await async_unload_entry(hass, config_entry)
+
+
 @pytest.mark.parametrize("mock_sensor_client", [[100]], indirect=True)
 async def test_sensor_icon_empty(hass, mock_sensor_client):
     """Test sensor."""
@@ -329,3 +446,58 @@ async def test_sensor_expired_history(hass, mock_sensor_client, caplog):
     assert state.state == "0"
 
     assert await async_unload_entry(hass, config_entry)
+
+
+async def test_sensor_tanks_added_and_removed(hass, mock_sensor_client):
+    """Entities and devices should follow the tanks reported for the account."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG)
+
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tank = coordinator.data[MOCK_TANK_SERIAL_NUMBER]
+    new_tank = replace(tank, serial_number="20005678", name="Second Tank", level=500)
+    coordinator.async_receive_data({tank.serial_number: tank, new_tank.serial_number: new_tank})
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.second_tank_oil_level").state == "500"
+    assert hass.states.get("sensor.tanky_mctankface_oil_level").state == str(MOCK_TANK_LEVEL)
+
+    coordinator.async_receive_data({new_tank.serial_number: new_tank})
+    await hass.async_block_till_done()
+
+    device_registry = dr.async_get(hass)
+    assert device_registry.async_get_device(identifiers={(DOMAIN, tank.serial_number)}) is None
+    assert hass.states.get("sensor.tanky_mctankface_oil_level") is None
+    assert hass.states.get("sensor.second_tank_oil_level").state == "500"
+
+    # Devices of tanks that are still reported cannot be removed by hand
+    device = device_registry.async_get_device(identifiers={(DOMAIN, new_tank.serial_number)})
+    assert not await async_remove_config_entry_device(hass, config_entry, device)
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_sensor_window_usage(hass, mock_sensor_client):
+    """Usage sensors for fixed windows should report the average usage over each window."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG)
+
+    config_entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.tanky_mctankface_usage_14_days") is None
+
+    entity_registry = er.async_get(hass)
+    entity_registry.async_update_entity("sensor.tanky_mctankface_usage_14_days", disabled_by=None)
+    await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    # The default usage window is also 14 days
+    state = hass.states.get("sensor.tanky_mctankface_usage_14_days")
+    assert state is not None
+    assert state.state == hass.states.get("sensor.tanky_mctankface_current_usage").state
+    assert state.attributes.get(ATTR_ICON) == "mdi:chart-line"
+
+    assert await async_unload_entry(hass, config_entry)